@@ -0,0 +1,86 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+MANIFEST_FILE = "manifest.sqlite"
+
+
+class AttachmentManifest:
+    """
+    SQLite record of every attachment download in a save directory, so a rerun
+    skips files that are already on disk and retries only the failures.
+    Safe to share between download threads.
+    """
+
+    def __init__(self, save_dir):
+        os.makedirs(save_dir, exist_ok=True)
+        self.path = os.path.join(save_dir, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS attachments (
+                file_id    TEXT PRIMARY KEY,
+                status     TEXT NOT NULL,
+                path       TEXT,
+                size       INTEGER,
+                checksum   TEXT,
+                document   TEXT,
+                error      TEXT,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def completed(self, file_id):
+        """
+        The stored file document when file_id was downloaded and the file is still
+        on disk with the recorded size, otherwise None.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT path, size, document FROM attachments WHERE file_id = ? AND status = 'done'",
+                (file_id,),
+            ).fetchone()
+        if not row:
+            return None
+
+        path, size, document = row
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            return None
+        return json.loads(document)
+
+    def record_done(self, file_id, file_obj, size, checksum):
+        self._write(file_id, "done", file_obj.get("path"), size, checksum, json.dumps(file_obj), None)
+
+    def record_failed(self, file_id, error=None):
+        self._write(file_id, "failed", None, None, None, None, error)
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM attachments GROUP BY status").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _write(self, file_id, status, path, size, checksum, document, error):
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO attachments (file_id, status, path, size, checksum, document, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(file_id) DO UPDATE SET
+                    status = excluded.status,
+                    path = excluded.path,
+                    size = excluded.size,
+                    checksum = excluded.checksum,
+                    document = excluded.document,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                (file_id, status, path, size, checksum, document, error,
+                 datetime.now(timezone.utc).isoformat()),
+            )
+            self.conn.commit()
@@ -0,0 +1,353 @@
+"""
+Write a synthetic HubSpot export (every CSV named in paths.py) for benchmarking.
+
+    python benchmarks/generate_export.py --contacts 50000 --out benchmarks/work
+
+Files go to <out>/data/, matching the ./data/... paths the importers read, so an
+importer run from <out> picks them up. Sizes scale with --contacts; fan-out and
+missing-value rates follow FANOUT and the per-column rates below.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import paths
+from constants import DEALSTAGE_TO_STAGE, OWNER_ID_TO_CONTACT_ID, TRACTION_LEVELS
+
+# Rows per contact for each main file, and association fan-out
+FANOUT = {
+    "companies": 0.05,
+    "deals": 0.8,
+    "cohorts": 0.0025,
+    "calls": 0.6,
+    "meetings": 0.3,
+    "emails": 1.5,
+    "notes": 0.8,
+    "tasks": 0.4,
+    "contacts_per_engagement": (1, 3),   # min, max
+    "engagement_deal_rate": 0.4,
+    "engagement_company_rate": 0.25,
+    "deal_cohort_rate": 0.9,
+    "contact_company_rate": 0.6,
+    "contact_cohort_rate": 0.7,
+}
+
+# Unused HubSpot properties appended to every main file; real exports carry
+# hundreds of these and most of them are blank
+PADDING_EMPTY_RATE = 0.95
+
+FIRST_NAMES = ["Ann", "Bob", "Carla", "Dev", "Erin", "Femi", "Gus", "Hana", "Ivan", "Jo"]
+LAST_NAMES = ["Lee", "Nguyen", "Smith", "Garcia", "Okafor", "Brown", "Khan", "Miller"]
+CITIES = [("St. Louis", "MO"), ("Kansas City", "MO"), ("Chicago", "IL"), ("Memphis", "TN")]
+DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "savvycoders.com", "icloud.com"]
+
+
+class Generator:
+    def __init__(self, contacts, padding, seed):
+        self.rng = random.Random(seed)
+        self.padding = [f"hs_custom_property_{i}" for i in range(padding)]
+        self.sizes = {"contacts": contacts}
+        for name in ("companies", "deals", "cohorts", "calls", "meetings", "emails", "notes", "tasks"):
+            self.sizes[name] = max(1, int(contacts * FANOUT[name]))
+
+        # HubSpot ids are large, sparse numbers
+        self.vids = self.id_range(1_000_000, contacts)
+        self.company_ids = self.id_range(5_000_000, self.sizes["companies"])
+        self.deal_ids = self.id_range(9_000_000, self.sizes["deals"])
+        self.cohort_ids = self.id_range(12_000_000, self.sizes["cohorts"])
+
+    def id_range(self, start, count):
+        return [str(start + i * 7) for i in range(count)]
+
+    # --- value helpers ---
+
+    def maybe(self, rate, value):
+        """ value, or "" with probability rate. """
+        return "" if self.rng.random() < rate else value
+
+    def timestamp(self, days_back=900):
+        moment = datetime(2025, 6, 1) - timedelta(seconds=self.rng.randint(0, days_back * 86400))
+        if self.rng.random() < 0.5:
+            return moment.strftime("%Y-%m-%d %H:%M:%S")
+        return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{self.rng.randint(0, 999):03d}Z"
+
+    def phone(self):
+        digits = f"{self.rng.randint(200, 999)}{self.rng.randint(200, 999)}{self.rng.randint(0, 9999):04d}"
+        style = self.rng.random()
+        if style < 0.4:
+            return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+        if style < 0.7:
+            return f"+1 {digits[:3]} {digits[3:6]} {digits[6:]}"
+        return digits
+
+    def email(self, first, last, i):
+        style = self.rng.random()
+        if style < 0.02:
+            return "not-an-email"
+        if style < 0.05:
+            return f" {first}.{last}{i}@{self.rng.choice(DOMAINS)} ".upper()
+        return f"{first}.{last}{i}@{self.rng.choice(DOMAINS)}".lower()
+
+    def owner(self):
+        return self.maybe(0.2, self.rng.choice(list(OWNER_ID_TO_CONTACT_ID)))
+
+    def padded(self, row):
+        for column in self.padding:
+            row[column] = self.maybe(PADDING_EMPTY_RATE, f"value {self.rng.randint(0, 99)}")
+        return row
+
+    # --- files ---
+
+    def contacts(self):
+        for i, vid in enumerate(self.vids):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            city, state = self.rng.choice(CITIES)
+            yield self.padded({
+                "VId": vid,
+                "firstname": self.maybe(0.05, first),
+                "lastname": self.maybe(0.08, last),
+                "email": self.maybe(0.03, self.email(first, last, i)),
+                "hs_all_owner_ids": self.owner(),
+                "phone": self.maybe(0.35, self.phone()),
+                "mobilephone": self.maybe(0.7, self.phone()),
+                "contact_type": self.maybe(0.5, self.rng.choice(["Student", "Lead", "Partner"])),
+                "city": self.maybe(0.3, city),
+                "state": self.maybe(0.3, state),
+                "zip": self.maybe(0.4, f"{self.rng.randint(10000, 99999)}"),
+                "country": self.maybe(0.6, "USA"),
+                "graduation_date": self.maybe(0.75, self.timestamp()),
+                "graduated_": self.maybe(0.5, self.rng.choice(["true", "false"])),
+                "gender": self.maybe(0.4, self.rng.choice(["Female", "Male", "Non-binary"])),
+                "ethnicity": self.maybe(0.5, self.rng.choice(["Black", "White", "Hispanic", "Asian"])),
+                "disability": self.maybe(0.8, self.rng.choice(["Yes", "No"])),
+                "veteran_status": self.maybe(0.8, self.rng.choice(["Veteran", "Not Applicable"])),
+                "age_group": self.maybe(0.5, self.rng.choice(["18-24", "25-34", "35-44", "45+"])),
+                "source": self.maybe(0.6, self.rng.choice(["Website", "Referral", "Event"])),
+            })
+
+    def companies(self):
+        for company_id in self.company_ids:
+            name = f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(['LLC', 'Inc', 'Group'])}"
+            city, state = self.rng.choice(CITIES)
+            yield self.padded({
+                "CompanyId": company_id,
+                "name": self.maybe(0.05, name),
+                "website": self.maybe(0.3, f"{name.split()[0].lower()}{company_id}.com"),
+                "hs_all_owner_ids": self.owner(),
+                "address": self.maybe(0.5, f"{self.rng.randint(1, 9999)} Main St"),
+                "address2": self.maybe(0.9, "Suite 100"),
+                "city": self.maybe(0.3, city),
+                "state": self.maybe(0.3, state),
+                "zip": self.maybe(0.5, f"{self.rng.randint(10000, 99999)}"),
+                "country": self.maybe(0.5, "United States"),
+                "industry": self.maybe(0.4, self.rng.choice(["COMPUTER_SOFTWARE", "HOSPITAL_HEALTH_CARE"])),
+                "description": self.maybe(0.6, "Synthetic company"),
+                "numberofemployees": self.maybe(0.5, str(self.rng.randint(1, 5000))),
+                "timezone": self.maybe(0.7, "America/Chicago"),
+                "linkedin_company_page": self.maybe(0.7, "https://linkedin.com/company/x"),
+                "twitterhandle": self.maybe(0.9, "@x"),
+                "facebook_company_page": self.maybe(0.9, "https://facebook.com/x"),
+                "hs_createdate": self.timestamp(),
+                "hs_lastmodifieddate": self.timestamp(90),
+                "lifecyclestage": self.maybe(0.3, self.rng.choice(["lead", "customer", "opportunity"])),
+                "hubspotscore": self.maybe(0.6, str(self.rng.randint(0, 100))),
+                "notes_last_contacted": self.maybe(0.5, self.timestamp()),
+                "notes_last_updated": self.maybe(0.5, self.timestamp()),
+                "hs_object_source": self.maybe(0.2, "CRM_UI"),
+                "notes_next_activity_date": self.maybe(0.8, self.timestamp()),
+                "hs_analytics_num_page_views": self.maybe(0.5, str(self.rng.randint(0, 500))),
+                "hs_analytics_num_visits": self.maybe(0.5, str(self.rng.randint(0, 100))),
+                "hs_analytics_latest_source": self.maybe(0.5, "ORGANIC_SEARCH"),
+                "hs_analytics_latest_source_data_1": self.maybe(0.7, "google"),
+                "hs_analytics_latest_source_data_2": self.maybe(0.9, "savvy coders"),
+            })
+
+    def deals(self):
+        stages = list(DEALSTAGE_TO_STAGE) + ["999999999"]
+        for deal_id in self.deal_ids:
+            yield self.padded({
+                "DealId": deal_id,
+                "dealname": self.maybe(0.02, f"Deal {deal_id}"),
+                "dealstage": self.rng.choice(stages),
+                "deal_traction": self.maybe(0.4, self.rng.choice(TRACTION_LEVELS + ["Blue"])),
+                "hs_all_owner_ids": self.owner(),
+                "reason": self.maybe(0.85, "Chose another program"),
+                "approved_funding_partner": self.maybe(0.6, self.rng.choice(["WIOA", "GI Bill", "Self"])),
+                "funding_status": self.maybe(0.6, self.rng.choice(["Approved", "Pending", "Denied"])),
+            })
+
+    def cohorts(self):
+        for i, cohort_id in enumerate(self.cohort_ids):
+            start = datetime(2021, 1, 4) + timedelta(weeks=8 * i)
+            yield self.padded({
+                "CohortsId": cohort_id,
+                "cohort_name_": f"Cohort {i + 1}",
+                "class": self.rng.choice(["Full Stack", "Data Analytics", "Cyber Security", ""]),
+                "cohort_start_date": start.strftime("%Y-%m-%d"),
+                "cohort_end_date": self.maybe(0.1, (start + timedelta(weeks=16)).strftime("%Y-%m-%d")),
+                "hs_object_id": cohort_id,
+                "hs_createdate": self.timestamp(),
+                "hs_lastmodifieddate": self.timestamp(90),
+                "hubspot_owner_id": self.owner(),
+                "hs_all_team_ids": self.maybe(0.7, "12345"),
+            })
+
+    def engagements(self, kind, offset):
+        fields = {
+            "call": lambda: {
+                "hs_call_title": self.maybe(0.2, "Intro call"),
+                "hs_call_summary": self.maybe(0.6, "Talked about the program"),
+                "hs_call_body": self.maybe(0.3, "Call notes " * self.rng.randint(1, 20)),
+                "hs_call_status": self.maybe(0.1, "COMPLETED"),
+            },
+            "meeting": lambda: {
+                "hs_meeting_title": self.maybe(0.1, "Admissions meeting"),
+                "hs_meeting_body": self.maybe(0.5, "Agenda " * self.rng.randint(1, 20)),
+                "hs_meeting_outcome": self.maybe(0.3, self.rng.choice(["COMPLETED", "NO_SHOW"])),
+                "hs_meeting_start_time": self.timestamp(),
+                "hs_meeting_end_time": self.maybe(0.1, self.timestamp()),
+            },
+            "email": lambda: {
+                "hs_email_subject": self.maybe(0.05, "Following up"),
+                "hs_body_preview": self.maybe(0.2, "Hi there, " * self.rng.randint(1, 30)),
+                "hs_email_status": self.maybe(0.4, "SENT"),
+            },
+            "note": lambda: {
+                "hs_note_body": self.maybe(0.05, "Note " * self.rng.randint(1, 40)),
+            },
+            "task": lambda: {
+                "hs_task_subject": self.maybe(0.05, "Follow up"),
+                "hs_task_body": self.maybe(0.4, "Task details"),
+                "hs_task_is_completed": self.rng.choice(["true", "false"]),
+                "hs_start_date": self.timestamp(),
+            },
+        }[kind]
+        start = 20_000_000 + offset * 10_000_000
+        for i in range(self.sizes[kind + "s"]):
+            attachments = ";".join(str(80_000_000 + offset * 1_000_000 + i * 3 + n)
+                                   for n in range(self.rng.choice([0, 0, 0, 1, 2])))
+            yield self.padded({
+                "EngagementId": str(start + i),
+                "engagement_type": kind,
+                "hs_object_id": str(start + i),
+                "hs_created_by_user_id": self.owner(),
+                "hubspot_owner_id": self.owner(),
+                "hs_createdate": self.timestamp(),
+                "hs_lastmodifieddate": self.timestamp(90),
+                "hs_attachment_ids": attachments,
+                **fields(),
+            })
+
+    # --- associations ---
+
+    def engagement_ids(self):
+        for offset, kind in enumerate(["call", "meeting", "email", "note", "task"]):
+            start = 20_000_000 + offset * 10_000_000
+            for i in range(self.sizes[kind + "s"]):
+                yield str(start + i)
+
+    def engagement_contacts(self):
+        low, high = FANOUT["contacts_per_engagement"]
+        for engagement_id in self.engagement_ids():
+            for vid in self.rng.sample(self.vids, min(len(self.vids), self.rng.randint(low, high))):
+                yield {"EngagementId": engagement_id, "VId": vid}
+
+    def engagement_deals(self):
+        for engagement_id in self.engagement_ids():
+            if self.rng.random() < FANOUT["engagement_deal_rate"]:
+                yield {"EngagementId": engagement_id, "DealId": self.rng.choice(self.deal_ids)}
+
+    def engagement_companies(self):
+        for engagement_id in self.engagement_ids():
+            if self.rng.random() < FANOUT["engagement_company_rate"]:
+                yield {"EngagementId": engagement_id, "CompanyId": self.rng.choice(self.company_ids)}
+
+    def contact_deals(self):
+        for deal_id in self.deal_ids:
+            yield {"VId": self.rng.choice(self.vids), "DealId": deal_id}
+
+    def deal_cohorts(self):
+        for deal_id in self.deal_ids:
+            if self.rng.random() < FANOUT["deal_cohort_rate"]:
+                yield {"DealId": deal_id, "CohortsId": self.rng.choice(self.cohort_ids)}
+
+    def company_contacts(self):
+        for vid in self.vids:
+            if self.rng.random() < FANOUT["contact_company_rate"]:
+                yield {"CompanyId": self.rng.choice(self.company_ids), "VId": vid}
+
+    def contact_cohorts(self):
+        for vid in self.vids:
+            if self.rng.random() < FANOUT["contact_cohort_rate"]:
+                yield {
+                    "VId": vid,
+                    "CohortsId": self.rng.choice(self.cohort_ids),
+                    "LabelContactTocohorts": self.maybe(0.8, self.rng.choice(["Student", "Instructor"])),
+                }
+
+    def files(self):
+        """ (paths.py path, rows) for every file in the export. """
+        return [
+            (paths.CONTACT_CSV, self.contacts()),
+            (paths.COMPANY_CSV, self.companies()),
+            (paths.PROCESS_CSV, self.deals()),
+            (paths.COHORT_CSV, self.cohorts()),
+            (paths.ENGAGEMENT_CALL_CSV, self.engagements("call", 0)),
+            (paths.ENGAGEMENT_MEETING_CSV, self.engagements("meeting", 1)),
+            (paths.ENGAGEMENT_EMAIL_CSV, self.engagements("email", 2)),
+            (paths.ENGAGEMENT_NOTE_CSV, self.engagements("note", 3)),
+            (paths.ENGAGEMENT_TASK_CSV, self.engagements("task", 4)),
+            (paths.ENGAGEMENT_CONTACT_JOIN, self.engagement_contacts()),
+            (paths.ENGAGEMENT_DEAL_JOIN, self.engagement_deals()),
+            (paths.ENGAGEMENT_COMPANY_JOIN, self.engagement_companies()),
+            (paths.PROCESS_JOIN_PATHS[0], self.contact_deals()),
+            (paths.PROCESS_JOIN_PATHS[1], self.deal_cohorts()),
+            (paths.COMPANY_JOIN_PATHS, self.company_contacts()),
+            (paths.CONTACT_COHORT_CSV, self.contact_cohorts()),
+        ]
+
+
+def write_csv(path, rows):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def generate(out_dir, contacts=10_000, padding=40, seed=42):
+    """ Write the export under out_dir/data. Returns {file name: row count}. """
+    generator = Generator(contacts, padding, seed)
+    counts = {}
+    for path, rows in generator.files():
+        target = os.path.join(out_dir, os.path.normpath(path))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        counts[os.path.basename(path)] = write_csv(target, rows)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic HubSpot export")
+    parser.add_argument("--contacts", type=int, default=10_000, help="Contacts; every other file scales with it")
+    parser.add_argument("--padding", type=int, default=40, help="Mostly-empty extra columns per main file")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "work"))
+    args = parser.parse_args()
+
+    counts = generate(args.out, args.contacts, args.padding, args.seed)
+    for name, count in counts.items():
+        print(f"{name:<36} {count:>10} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Benchmark every importer against a synthetic export and record the results.
+
+    python benchmarks/import_bench.py --contacts 20000                      # in-process stand-in (mongomock)
+    python benchmarks/import_bench.py --contacts 20000 --mongo mongodb://localhost:27017
+
+The export is generated into --work (unless it is already there for the same size),
+the benchmark database is dropped, and the importers run in dependency order against
+it. Each run appends one JSON line per importer (rows, wall time, rows/sec, peak RSS)
+to --results, so runs can be compared across commits.
+
+Peak RSS is reset before each importer where Linux allows it (/proc/self/clear_refs);
+elsewhere it is the process high-water mark so far.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import pandas as pd
+import paths
+from generate_export import generate
+
+# Importer → the CSVs whose rows it processes, in dependency order
+IMPORTER_ROWS = {
+    "contact": [paths.CONTACT_CSV],
+    "cohort": [paths.COHORT_CSV],
+    "company": [paths.COMPANY_CSV],
+    "process": [paths.PROCESS_CSV],
+    "contact-cohort": [paths.CONTACT_COHORT_CSV],
+    "activity": paths.ENGAGEMENT_PATHS,
+}
+
+
+def use_mongomock():
+    """
+    Swap pymongo.MongoClient for one shared in-memory mongomock client. Must run
+    before the importers are imported, since they bind MongoClient at import time.
+    """
+    # mongomock reads MONGODB as its server version when imported
+    uri = os.environ.pop("MONGODB", None)
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("❌ mongomock is not installed; pip install mongomock or pass --mongo URI")
+    finally:
+        if uri is not None:
+            os.environ["MONGODB"] = uri
+
+    import pymongo
+    patch_mongomock_bulk()
+    client = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: client
+    return "mongomock://"
+
+
+def patch_mongomock_bulk():
+    """
+    pymongo 4.11+ passes a sort option to the bulk builder's add_update/add_replace,
+    which mongomock (4.3) doesn't take. The importers never sort their updates, so
+    drop it when it is unset.
+    """
+    import inspect
+    from mongomock.collection import BulkOperationBuilder
+
+    def without_sort(method):
+        def add(*args, sort=None, **kwargs):
+            if sort is not None:
+                raise NotImplementedError("mongomock can't sort bulk updates")
+            return method(*args, **kwargs)
+        return add
+
+    for name in ("add_update", "add_replace"):
+        method = getattr(BulkOperationBuilder, name)
+        if "sort" not in inspect.signature(method).parameters:
+            setattr(BulkOperationBuilder, name, without_sort(method))
+
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def count_rows(csv_paths):
+    return sum(len(pd.read_csv(path, dtype=str, usecols=[0])) for path in csv_paths)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_export(work_dir, contacts, padding):
+    """ Generate the export unless work_dir already holds one of this size. """
+    stamp_path = os.path.join(work_dir, "export.json")
+    stamp = {"contacts": contacts, "padding": padding}
+    try:
+        with open(stamp_path) as f:
+            if json.load(f) == stamp:
+                return
+    except (OSError, ValueError):
+        pass
+
+    print(f"🏗️ Generating a {contacts}-contact export in {work_dir}…")
+    generate(work_dir, contacts, padding)
+    with open(stamp_path, "w") as f:
+        json.dump(stamp, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the importers on a synthetic export")
+    parser.add_argument("--contacts", type=int, default=10_000, help="Export size (see generate_export.py)")
+    parser.add_argument("--padding", type=int, default=40, help="Mostly-empty extra columns per main file")
+    parser.add_argument("--mongo", default=None, help="MongoDB URI (default: in-process mongomock)")
+    parser.add_argument("--db", default="import_bench", help="Database to import into; it is dropped first")
+    parser.add_argument("--work", default=os.path.join(BENCH_DIR, "work"), help="Export and cache directory")
+    parser.add_argument("--results", default=os.path.join(BENCH_DIR, "results.jsonl"))
+    parser.add_argument("--only", nargs="*", choices=list(IMPORTER_ROWS), help="Run only these importers")
+    parser.add_argument("--keep-cache", action="store_true", help="Reuse .cache (parsed CSVs, id snapshots) from earlier runs")
+    args = parser.parse_args()
+
+    work_dir = os.path.abspath(args.work)
+    results_path = os.path.abspath(args.results)
+    # Pick the backend first, so a missing mongomock fails fast
+    backend = args.mongo or use_mongomock()
+    prepare_export(work_dir, args.contacts, args.padding)
+
+    os.environ["MONGODB"] = backend if args.mongo else "mongodb://localhost"
+    os.environ["DB_NAME"] = args.db
+
+    # Importers resolve ./data and ./.cache against the working directory
+    os.chdir(work_dir)
+    if not args.keep_cache:
+        import shutil
+        shutil.rmtree(paths.CACHE_DIR, ignore_errors=True)
+
+    import pymongo
+    pymongo.MongoClient(os.environ["MONGODB"]).drop_database(args.db)
+
+    from pipeline import run_stage
+    import bulk_writer
+    writer_settings = dict(bulk_writer.SETTINGS)
+    options = {
+        "limit": None, "dry_run": False, "chunk_size": None, "jobs": 1, "metadata": "full",
+        "update": False, "workers": 1, "rate_limit": None, "metrics": None, "profile": None,
+        "resume": False, "file_cache_ttl": 168,
+    }
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "backend": "mongomock" if not args.mongo else "mongod",
+        "contacts": args.contacts,
+    }
+    results = []
+    for importer, csv_paths in IMPORTER_ROWS.items():
+        if args.only and importer not in args.only:
+            continue
+        rows = count_rows(csv_paths)
+
+        reset_peak_rss()
+        start = time.perf_counter()
+        run_stage(importer, options, writer_settings)
+        seconds = time.perf_counter() - start
+
+        results.append({
+            **run,
+            "importer": importer,
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        })
+
+    with open(results_path, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+    print(f"\n📊 {run['backend']}, {args.contacts} contacts, commit {run['commit']}")
+    print(f"{'importer':<16} {'rows':>10} {'seconds':>9} {'rows/sec':>10} {'peak RSS':>10}")
+    for result in results:
+        print(f"{result['importer']:<16} {result['rows']:>10} {result['seconds']:>9.2f} "
+              f"{result['rows_per_sec'] or 0:>10.0f} {result['peak_rss_mb']:>8.1f}MB")
+    print(f"\n📝 Appended to {results_path}")
+
+
+if __name__ == "__main__":
+    main()
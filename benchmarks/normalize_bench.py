@@ -0,0 +1,73 @@
+"""
+Microbenchmark: scalar normalize functions applied per cell vs. the batch versions.
+
+    python benchmarks/normalize_bench.py --rows 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from normalize import (
+    normalize_email, normalize_phone, parse_date, normalize_bool,
+    normalize_emails, normalize_phones, parse_dates, normalize_bools,
+)
+
+
+def make_columns(rows, seed=42):
+    rng = random.Random(seed)
+    emails = [
+        rng.choice(["", f" User{i}@Example.com ", f"user{i}@mail", f"u.{i}+tag@savvy.org"])
+        for i in range(rows)
+    ]
+    phones = [
+        rng.choice(["", f"({rng.randint(200, 999)}) 555-{i % 10000:04d}", f"+1 314 555 {i % 10000:04d}"])
+        for i in range(rows)
+    ]
+    # HubSpot timestamps repeat heavily (imports, bulk edits), so draw from a smaller pool
+    pool = [f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00" for _ in range(5000)]
+    dates = [rng.choice(pool + [""]) for _ in range(rows)]
+    bools = [rng.choice(["true", "false", "", "Yes", "0"]) for _ in range(rows)]
+    return {
+        "email": pd.Series(emails, dtype=str),
+        "phone": pd.Series(phones, dtype=str),
+        "date": pd.Series(dates, dtype=str),
+        "bool": pd.Series(bools, dtype=str),
+    }
+
+
+def timed(func, values):
+    start = time.perf_counter()
+    result = func(values)
+    return time.perf_counter() - start, list(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scalar vs batch normalize functions")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    columns = make_columns(args.rows)
+    pairs = [
+        ("email", normalize_email, normalize_emails),
+        ("phone", normalize_phone, normalize_phones),
+        ("date", parse_date, parse_dates),
+        ("bool", normalize_bool, normalize_bools),
+    ]
+
+    print(f"{'column':<8} {'scalar (s)':>12} {'batch (s)':>12} {'speedup':>9}")
+    for name, scalar, batch in pairs:
+        values = columns[name]
+        scalar_time, expected = timed(lambda s: [scalar(v) for v in s], values)
+        batch_time, actual = timed(batch, values)
+        assert expected == actual, f"{name}: batch output differs from scalar output"
+        print(f"{name:<8} {scalar_time:>12.3f} {batch_time:>12.3f} {scalar_time / batch_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
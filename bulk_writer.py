@@ -0,0 +1,519 @@
+import itertools
+import os
+import queue
+import random
+import threading
+import time
+from fingerprints import FingerprintStore, discard_fingerprints, fingerprint
+from indexes import preflight, has_index
+from paths import FAILURE_DIR
+
+# Defaults for every importer; main.py overrides them from the CLI via configure()
+SETTINGS = {
+    "batch_size": 1000,
+    "workers": 4,
+    # Skip operations whose document is unchanged since the last successful write
+    "delta": False,
+    # How $set upserts are sent: "upsert" as is, "insert" as plain inserts (for
+    # loads into an empty collection), or "auto": inserts for keys the collection
+    # doesn't have yet and updates for the rest
+    "mode": "upsert",
+    # Write the operations to this plan file instead of sending them (see plan.py)
+    "plan_path": None,
+    # Attempts per batch on transient errors (network, failover, write conflicts)
+    # before the import stops, and the first backoff in seconds (doubled each time)
+    "retries": 5,
+    "backoff": 0.5,
+}
+
+MODES = ("upsert", "insert", "auto")
+
+# Batches each writer thread may have waiting before add() blocks
+QUEUED_BATCHES = 2
+
+# Longest wait between two attempts at a batch, in seconds
+MAX_BACKOFF = 30
+
+# Write error codes worth sending the operation again for: network errors, elections
+# and failovers, interrupted or timed-out operations, write conflicts
+TRANSIENT_CODES = {6, 7, 50, 89, 91, 112, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+DUPLICATE_KEY = 11000
+
+# Numbers the failure files of this process
+_FAILURE_FILES = itertools.count(1)
+
+
+def configure(**settings):
+    SETTINGS.update({key: value for key, value in settings.items() if value is not None})
+
+
+class WriteTotals:
+    """ Counts from every bulk_write batch, combined. """
+
+    def __init__(self):
+        self.operations = 0
+        self.unchanged = 0
+        self.batches = 0
+        self.inserted = 0
+        self.upserted = 0
+        self.matched = 0
+        self.modified = 0
+        self.deleted = 0
+        # Operations that could not be written, saved to failure_path
+        self.failed = 0
+        self.failure_path = None
+        # Time spent in bulk_write, summed over the writer threads
+        self.write_seconds = 0.0
+
+    def add(self, result):
+        self.batches += 1
+        self.inserted += result.inserted_count or 0
+        self.upserted += result.upserted_count or 0
+        self.matched += result.matched_count or 0
+        self.modified += result.modified_count or 0
+        self.deleted += result.deleted_count or 0
+
+    def add_partial(self, details):
+        """ Count what a batch that raised BulkWriteError did write (details is e.details). """
+        self.inserted += details.get("nInserted", 0)
+        self.upserted += details.get("nUpserted", 0)
+        self.matched += details.get("nMatched", 0)
+        self.modified += details.get("nModified", 0)
+        self.deleted += details.get("nRemoved", 0)
+
+    def combine(self, other):
+        """ Add another writer's totals (e.g. from a worker process) to these. """
+        for name, value in vars(other).items():
+            if name == "failure_path":
+                self.failure_path = self.failure_path or value
+            else:
+                setattr(self, name, getattr(self, name) + value)
+
+    def __str__(self):
+        summary = (f"{self.upserted} upserted, {self.matched} matched, "
+                   f"{self.modified} modified in {self.batches} batches")
+        if self.inserted:
+            summary = f"{self.inserted} inserted, " + summary
+        if self.unchanged:
+            summary += f", {self.unchanged} unchanged skipped"
+        if self.failed:
+            summary += f", {self.failed} failed (saved to {self.failure_path})"
+        return summary
+
+
+class Write:
+    """
+    A queued write: an update of the document matching filter (upserted with upsert),
+    or with no filter, an insert of document. The writer builds the pymongo operation
+    only when it sends it.
+    """
+
+    def __init__(self, filter=None, update=None, upsert=False, document=None):
+        self.filter = filter
+        self.update = update
+        self.upsert = upsert
+        self.document = document
+        # Writes for the same match filter share a key; inserts have none
+        self.key = None if filter is None else repr(filter)
+
+    def is_set_upsert(self):
+        """ An upsert of {"$set": ...}, the shape every importer sends. """
+        return self.upsert and isinstance(self.update, dict) and list(self.update) == ["$set"]
+
+    def operation(self):
+        from pymongo import InsertOne, UpdateOne
+        if self.filter is None:
+            return InsertOne(self.document)
+        return UpdateOne(self.filter, self.update, upsert=self.upsert)
+
+
+class BulkWriter:
+    """
+    Writes to a collection while the caller keeps producing them: add() queues
+    updates, which `workers` threads send as unordered bulk_write batches of
+    batch_size. add() blocks when the writers fall behind, which keeps memory bounded.
+
+        with BulkWriter(collection, dry_run=dry_run) as writer:
+            for doc in docs:
+                writer.add({"externalId": doc["externalId"]}, {"$set": doc}, upsert=True)
+        print(writer.totals)
+    """
+
+    def __init__(self, collection, dry_run=False, batch_size=None, workers=None, delta=None, mode=None):
+        self.collection = collection
+        self.dry_run = dry_run
+        self.batch_size = batch_size or SETTINGS["batch_size"]
+        self.workers = max(1, workers or SETTINGS["workers"])
+        self.delta = SETTINGS["delta"] if delta is None else delta
+        self.mode = mode or SETTINGS["mode"]
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown write mode '{self.mode}', expected one of {', '.join(MODES)}")
+        # Match filter fields → keys known to exist (read from the collection in
+        # "auto" mode, plus everything this writer inserted)
+        self.existing_keys = {}
+        self.totals = WriteTotals()
+        self.error = None
+        self.lock = threading.Lock()
+        self.next_slot = 0
+        self.failures = None
+        self.failure_path = None
+        # Whether documents already in the collection were modified (kept apart from
+        # totals, which a caller may swap out), and whether some update matched on
+        # fields other than externalId, so that it may have set or changed one
+        self.changed_existing = False
+        self.matches_other_keys = False
+
+        # Check (and unless dry_run, create) the collection's required indexes
+        preflight(collection, create=not dry_run)
+        self.checked_filters = set()
+
+        # Delta runs load the fingerprints of the last writes; other runs discard them,
+        # since their writes make them stale
+        self.fingerprint_store = None
+        self.known_hashes = {}
+        if self.delta:
+            self.fingerprint_store = FingerprintStore(collection.full_name, read_only=dry_run)
+            self.known_hashes = self.fingerprint_store.load()
+        elif not dry_run:
+            discard_fingerprints(collection.full_name)
+
+        # With a plan file (used with dry_run) batches are saved instead of sent
+        self.plan = None
+        if SETTINGS["plan_path"]:
+            from plan import PlanRecorder
+            self.plan = PlanRecorder(SETTINGS["plan_path"])
+
+        self.pending = [[] for _ in range(self.workers)]
+        self.pending_keys = [set() for _ in range(self.workers)]
+        self.pending_hashes = [[] for _ in range(self.workers)]
+        self.queues = [queue.Queue(maxsize=QUEUED_BATCHES) for _ in range(self.workers)]
+        self.threads = []
+        if not dry_run:
+            for q in self.queues:
+                thread = threading.Thread(target=self._run, args=(q,), daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def add(self, filter, update, upsert=False, fingerprint_source=None, digest=None):
+        """
+        Queue an update of the document matching filter. Every write for the same
+        filter goes to the same thread, and a batch never holds the same filter twice,
+        so repeated keys are still applied in the order they were added.
+
+        In delta mode an update whose fingerprint is the same as the last one written
+        for its filter is dropped. fingerprint_source replaces the update document when
+        fingerprinting, for documents with fields that differ on every run; digest is a
+        fingerprint computed earlier (e.g. saved in a plan).
+        """
+        self._raise_error()
+        write = Write(filter, update, upsert=upsert)
+        # Kept for routing and fingerprints when the write becomes an insert
+        key = write.key
+
+        if not self.delta:
+            digest = None
+        else:
+            if digest is None:
+                digest = fingerprint(update if fingerprint_source is None else fingerprint_source)
+            if self.known_hashes.get(key) == digest:
+                self.totals.unchanged += 1
+                return
+
+        self._check_index(filter)
+        self.matches_other_keys |= list(filter) != ["externalId"]
+        if not self.plan:
+            write = self._insert_if_new(write)
+        slot = hash(key) % self.workers
+        if key in self.pending_keys[slot]:
+            self._flush(slot)
+        self.pending_keys[slot].add(key)
+        self._queue(slot, write, key, digest)
+
+    def insert(self, document):
+        """ Queue an insert of document (e.g. one saved in a failure file). """
+        self._raise_error()
+        slot = self.next_slot
+        self.next_slot = (self.next_slot + 1) % self.workers
+        self._queue(slot, Write(document=document), None, None)
+
+    def _queue(self, slot, write, key, digest):
+        self.pending[slot].append(write)
+        self.pending_hashes[slot].append((key, digest))
+        self.totals.operations += 1
+        if len(self.pending[slot]) >= self.batch_size:
+            self._flush(slot)
+
+    def sync(self):
+        """
+        Send everything added so far and wait until MongoDB has acknowledged it (or it
+        was saved as failed), e.g. before recording a checkpoint. Writers keep running.
+        """
+        for slot in range(self.workers):
+            self._flush(slot)
+        for q in self.queues[:len(self.threads)]:
+            q.join()
+        self._discard_stale_ids()
+        self._raise_error()
+
+    def close(self):
+        """ Send what is left, wait for the writers and return the combined totals. """
+        for slot in range(self.workers):
+            self._flush(slot)
+        self._stop()
+        self._close_files()
+        self._discard_stale_ids()
+        self._raise_error()
+        return self.totals
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            # Don't keep writing after the producer failed
+            self.error = self.error or exc
+            self._stop()
+            self._close_files()
+            # Batches in flight when the producer failed may have been applied uncounted
+            self.changed_existing |= self.totals.operations > 0
+            self._discard_stale_ids()
+            return False
+        self.close()
+        return False
+
+    def _insert_if_new(self, write):
+        """
+        In "insert" and "auto" mode (SETTINGS["mode"]), a $set upsert for a key that
+        isn't in the collection is sent as an insert of the filter plus the $set
+        fields, which is much cheaper than an upsert. "auto" first reads the keys
+        already in the collection; "insert" assumes there are none. Later writes for
+        a key inserted by this writer are sent as updates.
+        """
+        if self.mode == "upsert" or not write.is_set_upsert():
+            return write
+
+        fields = tuple(write.filter)
+        known = self.existing_keys.get(fields)
+        if known is None:
+            if self.mode == "auto":
+                known = self._read_keys(fields)
+            else:
+                known = set()
+                if self.collection.estimated_document_count():
+                    print(f"⚠️ --mode insert on {self.collection.name}, which isn't empty; "
+                          "existing keys will fail as duplicates (use --mode auto)")
+            self.existing_keys[fields] = known
+
+        if write.key in known:
+            return write
+        known.add(write.key)
+        return Write(document={**write.filter, **write.update["$set"]})
+
+    def _read_keys(self, fields):
+        """ Keys (as Write builds them) of the documents already in the collection. """
+        projection = {field: 1 for field in fields}
+        projection["_id"] = 0
+        return {
+            repr({field: doc.get(field) for field in fields})
+            for doc in self.collection.find({}, projection)
+        }
+
+    def _check_index(self, match_filter):
+        fields = tuple(match_filter)
+        if fields in self.checked_filters:
+            return
+        self.checked_filters.add(fields)
+        if not has_index(self.collection, fields):
+            print(f"⚠️ No index on ({', '.join(fields)}) in {self.collection.name}; "
+                  "every upsert will scan the collection. Run `python main.py indexes`.")
+
+    def _flush(self, slot):
+        batch = self.pending[slot]
+        if not batch:
+            return
+        hashes = self.pending_hashes[slot]
+        self.pending[slot] = []
+        self.pending_keys[slot] = set()
+        self.pending_hashes[slot] = []
+
+        if self.dry_run:
+            if self.plan:
+                self.plan.write(self.collection.name, batch, hashes)
+            self.totals.batches += 1
+            return
+
+        while True:
+            self._raise_error()
+            try:
+                self.queues[slot].put((batch, hashes), timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self, q):
+        while True:
+            item = q.get()
+            if item is None:
+                q.task_done()
+                return
+            if not self.error:
+                batch, hashes = item
+                try:
+                    self._send(batch, hashes)
+                except Exception as e:
+                    with self.lock:
+                        self.error = self.error or e
+            q.task_done()
+
+    def _send(self, batch, hashes):
+        """
+        bulk_write a batch of Writes. A batch that fails on a transient error (network,
+        failover, write conflict) is sent again after a backoff, up to SETTINGS["retries"]
+        times. When only some of its writes fail, just those are retried if their error
+        is transient; the ones that can't be written (e.g. a document MongoDB rejects)
+        are saved to a failure file and the import carries on.
+        """
+        from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure
+
+        # Writes an attempt that failed as a whole may still have applied (by id()); a
+        # duplicate key on one of their inserts is only ignored if its own _id is there
+        maybe_applied = set()
+        for attempt in range(SETTINGS["retries"] + 1):
+            if attempt:
+                time.sleep(min(MAX_BACKOFF, SETTINGS["backoff"] * 2 ** (attempt - 1)) * random.uniform(0.5, 1))
+            start = time.perf_counter()
+            try:
+                result = self.collection.bulk_write([write.operation() for write in batch], ordered=False)
+            except BulkWriteError as e:
+                if e.details.get("writeConcernErrors"):
+                    raise
+                errors = {error["index"]: error for error in e.details["writeErrors"]}
+                retry, retry_hashes, failed = [], [], []
+                for index, (write, entry) in enumerate(zip(batch, hashes)):
+                    error = errors.get(index)
+                    if error is None:
+                        continue
+                    if (error["code"] == DUPLICATE_KEY and write.filter is None
+                            and id(write) in maybe_applied and self._inserted(write)):
+                        # Inserted by an attempt whose reply was lost
+                        continue
+                    if error["code"] in TRANSIENT_CODES or (error["code"] == DUPLICATE_KEY and write.upsert):
+                        retry.append(write)
+                        retry_hashes.append(entry)
+                    else:
+                        failed.append((write, entry, error))
+                with self.lock:
+                    self.totals.write_seconds += time.perf_counter() - start
+                    self.totals.add_partial(e.details)
+                    self.changed_existing |= bool(e.details.get("nModified"))
+                    self.totals.batches += 1
+                    self._record_fingerprints(
+                        entry for index, entry in enumerate(hashes) if index not in errors
+                    )
+                self._save_failures(failed)
+                if not retry:
+                    return
+                batch, hashes = retry, retry_hashes
+                continue
+            except (ConnectionFailure, OperationFailure) as e:
+                transient = isinstance(e, ConnectionFailure) or e.code in TRANSIENT_CODES \
+                    or e.has_error_label("RetryableWriteError")
+                if not transient or attempt == SETTINGS["retries"]:
+                    raise
+                maybe_applied.update(map(id, batch))
+                print(f"⚠️ bulk_write on {self.collection.name} failed ({e}); retrying {len(batch)} operations")
+                continue
+
+            with self.lock:
+                self.totals.write_seconds += time.perf_counter() - start
+                self.totals.add(result)
+                self.changed_existing |= bool(result.modified_count)
+                self._record_fingerprints(hashes)
+            return
+
+        # Only per-operation transient errors are left after the last attempt
+        self._save_failures([(write, entry, {"errmsg": "still failing after retries"})
+                             for write, entry in zip(batch, hashes)])
+
+    def _inserted(self, write):
+        """ Whether an insert's own document (by the _id pymongo gave it when sending) is in the collection. """
+        object_id = write.document.get("_id")
+        return object_id is not None and self.collection.find_one({"_id": object_id}, {"_id": 1}) is not None
+
+    def _save_failures(self, failed):
+        """
+        Append writes that could not be written, with their errors, to a failure file
+        in FAILURE_DIR (a plan, which `apply` can send again once fixed).
+        """
+        if not failed:
+            return
+        from plan import PlanRecorder, encode_write, write_header
+
+        with self.lock:
+            if self.failures is None:
+                os.makedirs(FAILURE_DIR, exist_ok=True)
+                header = {"plan": 1, "command": f"failed writes to {self.collection.name}",
+                          "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                          "database": self.collection.database.name}
+                # Several writers of one process may fail in the same second; never reuse a file
+                while True:
+                    path = os.path.join(FAILURE_DIR, f"{self.collection.name}-{time.strftime('%Y%m%d-%H%M%S')}"
+                                                     f"-{os.getpid()}-{next(_FAILURE_FILES)}.bson")
+                    try:
+                        write_header(path, header, exclusive=True)
+                        break
+                    except FileExistsError:
+                        continue
+                self.failures = PlanRecorder(path)
+                self.failure_path = path
+                print(f"⚠️ Saving operations that can't be written to {path}")
+            self.failures.write_records(
+                {**encode_write(self.collection.name, write, digest),
+                 "error": {"code": error.get("code"), "message": error.get("errmsg")}}
+                for write, (_, digest), error in failed
+            )
+            self.totals.failed += len(failed)
+            # Set on each write: a caller may swap in fresh totals (see import_activity.py)
+            self.totals.failure_path = self.failure_path
+
+    def _record_fingerprints(self, hashes):
+        """ Save the fingerprints of acknowledged operations ((key, digest) pairs); call with the lock held. """
+        if self.fingerprint_store is None:
+            return
+        self.fingerprint_store.save({key: digest for key, digest in hashes if digest is not None})
+
+    def _close_files(self):
+        if self.fingerprint_store:
+            self.fingerprint_store.close()
+        if self.plan:
+            self.plan.close()
+        if self.failures:
+            self.failures.close()
+
+    def _discard_stale_ids(self):
+        """
+        Drop the collection's externalId snapshot once this writer modified existing
+        documents through updates that don't match on externalId (e.g. contacts by
+        email), which may have set or changed one. Updates matched by externalId
+        can't, and deletions are caught by the snapshot's document count.
+        """
+        if self.changed_existing and self.matches_other_keys and not self.dry_run:
+            from id_resolver import discard_id_snapshot  # deferred: pulls in numpy
+            discard_id_snapshot(self.collection.database.name, self.collection.name)
+
+    def _stop(self):
+        for q, thread in zip(self.queues, self.threads):
+            while thread.is_alive():
+                try:
+                    q.put(None, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def _raise_error(self):
+        if self.error:
+            raise self.error
+
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+from csv_cache import source_stamp
+from paths import CHECKPOINT_DIR
+
+
+class Checkpoint:
+    """
+    How far a long import got, saved after every unit (rows of a source CSV, a slice
+    of attachments) whose writes MongoDB acknowledged, so that `--resume` can carry
+    on from there after a crash instead of starting over.
+
+    The checkpoint is tied to a fingerprint of the input files and the settings that
+    shape the output; when either changed, resume starts from the beginning. It is
+    removed once the import completes. Nothing is saved when enabled is False
+    (dry runs).
+
+        checkpoint = Checkpoint("activity", paths, {"limit": limit}, resume=resume)
+        start = checkpoint.rows(path)
+        ...
+        checkpoint.save(path, rows, done=True)
+        checkpoint.complete()
+    """
+
+    def __init__(self, name, sources, settings, resume=False, enabled=True):
+        self.path = os.path.join(CHECKPOINT_DIR, f"{name}.json")
+        self.enabled = enabled
+        self.inputs = inputs_fingerprint(sources, settings)
+        self.progress = {}
+
+        if resume:
+            saved = self._load()
+            if saved is None:
+                print(f"⚠️ No {name} checkpoint to resume from; starting from the beginning.")
+            elif saved.get("inputs") != self.inputs:
+                print(f"⚠️ The {name} inputs changed since the checkpoint; starting from the beginning.")
+            else:
+                self.progress = saved["progress"]
+                print(f"⏩ Resuming {name} from its checkpoint:")
+                for key, unit in self.progress.items():
+                    print(f"   {key}: {'done' if unit['done'] else str(unit['rows']) + ' written'}")
+
+    def rows(self, key):
+        """ Rows (or items) of key already written. """
+        return self.progress.get(key, {}).get("rows", 0)
+
+    def done(self, key):
+        return self.progress.get(key, {}).get("done", False)
+
+    def save(self, key, rows, done=False):
+        self.progress[key] = {"rows": rows, "done": done}
+        if not self.enabled:
+            return
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"inputs": self.inputs, "progress": self.progress}, f)
+        os.replace(tmp_path, self.path)
+
+    def complete(self):
+        if self.enabled and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def inputs_fingerprint(sources, settings):
+    """ Hash of the source files' size and mtime, the settings and the target database. """
+    stamps = [source_stamp(path) if os.path.exists(path) else {"source": path} for path in sources]
+    state = {"sources": stamps, "settings": settings, "database": os.getenv("DB_NAME")}
+    return hashlib.sha1(json.dumps(state, sort_keys=True, default=str).encode("utf-8")).hexdigest()
@@ -0,0 +1,63 @@
+import importlib
+
+# Importers' modules (and pandas, pymongo, requests with them) are only imported
+# when their command runs, so `main.py --help` and light commands start fast.
+#
+# To add a command, register it below:
+#     register("name", "module:function", "Help line", ("limit", "dry_run"))
+# options are the CLI options passed to the function, in order (None passes the
+# whole options dict). A command fails (exit status 1) when it returns False.
+
+DEFAULT_OPTIONS = ("limit", "dry_run")
+
+
+class Command:
+    def __init__(self, name, target, help, options=DEFAULT_OPTIONS):
+        self.name = name
+        self.target = target
+        self.help = help
+        self.options = options
+
+    def load(self):
+        module_name, function_name = self.target.split(":")
+        return getattr(importlib.import_module(module_name), function_name)
+
+    def run(self, options):
+        """ Import the command's module and call it with options (a dict of CLI options). """
+        function = self.load()
+        if self.options is None:
+            return function(options)
+        return function(*(options[name] for name in self.options))
+
+
+COMMANDS = {}
+
+
+def register(name, target, help, options=DEFAULT_OPTIONS):
+    COMMANDS[name] = Command(name, target, help, options)
+
+
+def describe():
+    """ One line per command, for --help. """
+    width = max(map(len, COMMANDS))
+    return "\n".join(f"  {name:<{width}}  {command.help}" for name, command in COMMANDS.items())
+
+
+register("contact", "import_contact:import_contact", "Import contacts (with deal funding)")
+register("cohort", "import_cohort:import_cohort", "Import cohorts")
+register("company", "import_company:import_company", "Import companies and link their contacts")
+register("process", "import_process:import_process", "Import deals as processes")
+register("contact-cohort", "import_contact_cohort_association:import_contact_cohort_links",
+         "Link contacts to cohorts")
+register("activity", "import_activity:import_activity", "Import engagements as activities",
+         ("limit", "dry_run", "chunk_size", "jobs", "resume"))
+register("attachment", "import_attachments:download_all_engagement_attachments",
+         "Download engagement attachments and save file records",
+         ("limit", "dry_run", "update", "workers", "rate_limit", "resume", "file_cache_ttl"))
+register("all", "pipeline:run_all", "Run every import in dependency order", None)
+register("update", "updates:update_stages", "Set each process's currentStage to its first stage",
+         ("dry_run", "range_size"))
+register("indexes", "indexes:run_indexes_command", "Create or verify the indexes on import match keys",
+         ("dry_run",))
+register("apply", "plan:apply_plan", "Send the operations saved with --plan-out FILE: apply FILE",
+         ("file", "dry_run"))
@@ -0,0 +1,81 @@
+import json
+import os
+import hashlib
+import pandas as pd
+from paths import CSV_CACHE_DIR
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; without it every read parses the CSV
+    feather = None
+
+
+def load_csv(path, usecols=None):
+    """
+    Same as pd.read_csv(path, dtype=str).fillna(""), but the parsed frame is kept in a
+    Feather (Arrow) file under .cache/csv. Later reads memory-map that file instead of
+    parsing the CSV again, until the source file's size or mtime changes.
+
+    usecols limits the parse to those columns (ones missing from the file are ignored);
+    each column selection is cached separately.
+    """
+    if feather is None:
+        return read_csv(path, usecols).fillna("")
+
+    cache_path, meta_path = cache_paths(path, usecols)
+    source = source_stamp(path)
+
+    if os.path.exists(cache_path) and read_meta(meta_path) == source:
+        try:
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+        except (OSError, ValueError):
+            pass  # unreadable cache entry, rebuild it below
+
+    df = read_csv(path, usecols).fillna("")
+    write_cache(df, cache_path, meta_path, source)
+    return df
+
+
+def read_csv(path, usecols=None, **kwargs):
+    """ pd.read_csv(path, dtype=str), tolerating usecols entries the file doesn't have. """
+    if usecols is not None:
+        wanted = set(usecols)
+        kwargs["usecols"] = lambda column: column in wanted
+    return pd.read_csv(path, dtype=str, **kwargs)
+
+
+def cache_paths(path, usecols=None):
+    source = os.path.abspath(path)
+    if usecols is not None:
+        source += "|" + ",".join(sorted(usecols))
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    base = os.path.join(CSV_CACHE_DIR, f"{os.path.basename(path)}.{digest}")
+    return f"{base}.feather", f"{base}.json"
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(df, cache_path, meta_path, source):
+    os.makedirs(CSV_CACHE_DIR, exist_ok=True)
+    # Parallel importers may build the same entry; write to per-process temp files
+    tmp_suffix = f".{os.getpid()}.tmp"
+    try:
+        feather.write_feather(df, cache_path + tmp_suffix)
+    except Exception as e:
+        print(f"⚠️ Could not cache {source['source']}: {e}")
+        return
+    with open(meta_path + tmp_suffix, "w") as f:
+        json.dump(source, f)
+    os.replace(cache_path + tmp_suffix, cache_path)
+    os.replace(meta_path + tmp_suffix, meta_path)
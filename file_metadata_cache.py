@@ -0,0 +1,63 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from paths import FILE_METADATA_CACHE
+
+# Fields of HubSpot's signed-url response that describe the file. The URL itself
+# expires within minutes, so it is never cached.
+CACHED_FIELDS = ("name", "extension", "size", "type")
+
+# Default time to live of a cached entry, in hours
+DEFAULT_TTL_HOURS = 168
+
+
+class FileMetadataCache:
+    """
+    HubSpot file metadata by file id, kept in SQLite so `attachment --update` can
+    rebuild file records without an API request per attachment. Entries older than
+    ttl_hours are fetched again (0 always fetches). Safe to share between threads.
+    """
+
+    def __init__(self, ttl_hours=DEFAULT_TTL_HOURS, path=FILE_METADATA_CACHE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                file_id    TEXT PRIMARY KEY,
+                metadata   TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, file_id):
+        """ The cached metadata for file_id, or None when missing or expired. """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT metadata, fetched_at FROM files WHERE file_id = ?", (file_id,)
+            ).fetchone()
+            if row and time.time() - row[1] <= self.ttl:
+                self.hits += 1
+                return json.loads(row[0])
+            self.misses += 1
+        return None
+
+    def put(self, file_id, attachment):
+        metadata = {field: attachment[field] for field in CACHED_FIELDS if field in attachment}
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO files (file_id, metadata, fetched_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(file_id) DO UPDATE SET metadata = excluded.metadata, fetched_at = excluded.fetched_at",
+                (file_id, json.dumps(metadata), time.time()),
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import sqlite3
+from paths import FINGERPRINT_DIR
+
+
+def fingerprint(doc):
+    """ Short content hash of a document (or any value with a stable repr). """
+    return hashlib.blake2b(repr(doc).encode("utf-8"), digest_size=16).digest()
+
+
+class FingerprintStore:
+    """
+    Content hash of the last document successfully written per match key, for one
+    collection. Lets a delta import skip rows that haven't changed since the last run.
+    """
+
+    def __init__(self, collection_full_name, read_only=False):
+        self.path = store_path(collection_full_name)
+        self.conn = None
+        if read_only:
+            # Dry runs only read what an earlier run saved, and create nothing
+            if os.path.exists(self.path):
+                self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            return
+        os.makedirs(FINGERPRINT_DIR, exist_ok=True)
+        # Parallel importer processes may save to the same store; wait for the lock
+        self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS fingerprints (key TEXT PRIMARY KEY, hash BLOB NOT NULL)")
+        self.conn.commit()
+
+    def load(self):
+        if self.conn is None:
+            return {}
+        return dict(self.conn.execute("SELECT key, hash FROM fingerprints"))
+
+    def save(self, hashes):
+        """ Record hashes (match key → hash); called with each acknowledged batch. """
+        if not hashes or self.conn is None:
+            return
+        self.conn.executemany(
+            "INSERT INTO fingerprints (key, hash) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET hash = excluded.hash",
+            hashes.items(),
+        )
+        self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def store_path(collection_full_name):
+    return os.path.join(FINGERPRINT_DIR, f"{collection_full_name}.sqlite")
+
+
+def discard_fingerprints(collection_full_name):
+    """
+    Forget a collection's fingerprints. Writes without --delta don't record them, so
+    after one the stored hashes may no longer match the documents in MongoDB.
+    """
+    try:
+        os.remove(store_path(collection_full_name))
+    except FileNotFoundError:
+        # Already gone, or another worker process of the same run removed it first
+        pass
@@ -0,0 +1,125 @@
+import re
+import numpy as np
+from bson import ObjectId
+
+# externalIds that round-trip through int64 unchanged ("123", not "0123" or " 123")
+NUMERIC_KEY = re.compile(r"0|[1-9][0-9]{0,17}")
+
+# Entries buffered by IdIndexBuilder before they are packed into arrays
+BUILD_CHUNK = 100_000
+
+
+class IdIndex:
+    """
+    externalId → ObjectId, read-only, in a fraction of a dict's memory.
+
+    Numeric externalIds (nearly all HubSpot ids) are kept as a sorted int64 array next
+    to a packed array of 12-byte ObjectIds, about 20 bytes an entry, and found by
+    binary search. Any other externalId falls back to a small dict. Supports the dict
+    lookups the importers use (get, in, [], len) and lookup() for a whole column.
+    """
+
+    def __init__(self, numeric_keys=None, numeric_ids=None, other=None):
+        self.numeric_keys = np.empty(0, dtype=np.int64) if numeric_keys is None else numeric_keys
+        self.numeric_ids = np.empty((0, 12), dtype=np.uint8) if numeric_ids is None else numeric_ids
+        self.other = other or {}
+
+    def __len__(self):
+        return len(self.numeric_keys) + len(self.other)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        object_id = self.get(key)
+        if object_id is None:
+            raise KeyError(key)
+        return object_id
+
+    def get(self, key, default=None):
+        if isinstance(key, str) and NUMERIC_KEY.fullmatch(key):
+            number = int(key)
+            pos = np.searchsorted(self.numeric_keys, number)
+            if pos < len(self.numeric_keys) and self.numeric_keys[pos] == number:
+                return ObjectId(self.numeric_ids[pos].tobytes())
+            return default
+        try:
+            return self.other.get(key, default)
+        except TypeError:  # unhashable
+            return default
+
+    def lookup(self, keys):
+        """ ObjectId (or None) for every key in keys, as an object array. """
+        keys = np.asarray(keys, dtype=object)
+        result = np.full(len(keys), None, dtype=object)
+
+        numeric = np.fromiter(
+            (isinstance(key, str) and NUMERIC_KEY.fullmatch(key) is not None for key in keys),
+            dtype=bool, count=len(keys),
+        )
+        if numeric.any():
+            numbers = keys[numeric].astype(np.int64)
+            if len(self.numeric_keys):
+                # Past-the-end positions compare against the largest key, which is smaller
+                positions = np.minimum(np.searchsorted(self.numeric_keys, numbers), len(self.numeric_keys) - 1)
+                found = self.numeric_keys[positions] == numbers
+            else:
+                positions = np.zeros(len(numbers), dtype=np.intp)
+                found = np.zeros(len(numbers), dtype=bool)
+            packed = self.numeric_ids[positions[found]].tobytes()
+            object_ids = np.empty(int(found.sum()), dtype=object)
+            object_ids[:] = [ObjectId(packed[i:i + 12]) for i in range(0, len(packed), 12)]
+            result[np.flatnonzero(numeric)[found]] = object_ids
+
+        if self.other and not numeric.all():
+            for i in np.flatnonzero(~numeric):
+                result[i] = self.get(keys[i])
+
+        return result
+
+    def merged(self, newer):
+        """ A new index with newer's entries added, replacing any for the same keys. """
+        return IdIndex(*pack_latest(
+            [self.numeric_keys, newer.numeric_keys],
+            [self.numeric_ids, newer.numeric_ids],
+        ), {**self.other, **newer.other})
+
+
+class IdIndexBuilder:
+    """ Collects (externalId, ObjectId) pairs into an IdIndex; later pairs win. """
+
+    def __init__(self):
+        self.key_chunks, self.id_chunks = [], []
+        self.keys, self.ids = [], []
+        self.other = {}
+
+    def add(self, key, object_id):
+        key = str(key)
+        if NUMERIC_KEY.fullmatch(key):
+            self.keys.append(int(key))
+            self.ids.append(object_id.binary)
+            if len(self.keys) >= BUILD_CHUNK:
+                self._pack()
+        else:
+            self.other[key] = object_id
+
+    def build(self):
+        self._pack()
+        return IdIndex(*pack_latest(self.key_chunks, self.id_chunks), self.other)
+
+    def _pack(self):
+        if not self.keys:
+            return
+        self.key_chunks.append(np.array(self.keys, dtype=np.int64))
+        self.id_chunks.append(np.frombuffer(b"".join(self.ids), dtype=np.uint8).reshape(-1, 12))
+        self.keys, self.ids = [], []
+
+
+def pack_latest(key_chunks, id_chunks):
+    """ Concatenate, sort by key and keep the last entry added for each key. """
+    keys = np.concatenate(key_chunks) if key_chunks else np.empty(0, dtype=np.int64)
+    ids = np.concatenate(id_chunks) if id_chunks else np.empty((0, 12), dtype=np.uint8)
+    order = np.argsort(keys, kind="stable")
+    keys, ids = keys[order], ids[order]
+    last = np.append(keys[1:] != keys[:-1], True) if len(keys) else np.empty(0, dtype=bool)
+    return keys[last], ids[last]
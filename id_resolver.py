@@ -0,0 +1,116 @@
+import os
+import shutil
+import numpy as np
+from bson import ObjectId
+from id_index import IdIndex, IdIndexBuilder
+from paths import ID_SNAPSHOT_DIR
+
+FETCH_BATCH_SIZE = 10000
+
+
+def load_id_map(db, collection_name):
+    """
+    externalId → _id for every document in a collection, as a compact IdIndex.
+
+    The map is saved to a snapshot on disk. Later calls only load documents inserted
+    since the snapshot (_id greater than the last one seen), so back-to-back importers
+    don't rescan the same collections. Falls back to a full scan when there is no
+    snapshot or the document count no longer adds up (e.g. documents were deleted).
+    Updates matched on other fields (contacts by email) can set or change an existing
+    document's externalId, which the _id watermark can't see, so BulkWriter discards
+    the snapshot after those (discard_id_snapshot); the next call rescans it.
+    """
+    collection = db[collection_name]
+    path = snapshot_path(db.name, collection_name)
+    snapshot = read_snapshot(path)
+
+    if snapshot:
+        ids, last_id, scanned = snapshot
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        new_ids, new_last_id, new_scanned = scan_ids(collection, query)
+        total = collection.count_documents({})
+
+        if scanned + new_scanned == total:
+            if new_scanned:
+                ids = ids.merged(new_ids)
+            print(f"   → {collection_name}: {len(ids)} ids from snapshot, {new_scanned} new")
+            if new_scanned:
+                write_snapshot(path, ids, new_last_id, total)
+            return ids
+        print(f"   → {collection_name}: snapshot out of date, rescanning")
+
+    ids, last_id, scanned = scan_ids(collection, {})
+    print(f"   → {collection_name}: {len(ids)} ids scanned")
+    write_snapshot(path, ids, last_id, scanned)
+    return ids
+
+
+def fetch_by_ids(collection, ids, projection):
+    """ Fetch only the given documents, in batches, as a dict keyed by _id. """
+    ids = list(ids)
+    docs = {}
+    for start in range(0, len(ids), FETCH_BATCH_SIZE):
+        batch = ids[start:start + FETCH_BATCH_SIZE]
+        for doc in collection.find({"_id": {"$in": batch}}, projection):
+            docs[doc["_id"]] = doc
+    return docs
+
+
+def clear_id_snapshots():
+    shutil.rmtree(ID_SNAPSHOT_DIR, ignore_errors=True)
+
+
+def discard_id_snapshot(db_name, collection_name):
+    """ Forget one collection's snapshot, e.g. after documents in it were updated. """
+    try:
+        os.remove(snapshot_path(db_name, collection_name))
+    except FileNotFoundError:
+        # Never saved, or another writer of the same run removed it first
+        pass
+
+
+def scan_ids(collection, query):
+    """ Returns (externalId → _id IdIndex, largest _id seen, number of documents scanned). """
+    builder = IdIndexBuilder()
+    last_id = None
+    scanned = 0
+    for doc in collection.find(query, {"externalId": 1}).sort("_id", 1):
+        scanned += 1
+        last_id = doc["_id"]
+        if doc.get("externalId"):
+            builder.add(doc["externalId"], doc["_id"])
+    return builder.build(), last_id, scanned
+
+
+def snapshot_path(db_name, collection_name):
+    return os.path.join(ID_SNAPSHOT_DIR, f"{db_name}.{collection_name}.npz")
+
+
+def read_snapshot(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            other = dict(zip(data["other_keys"].tolist(), map(ObjectId, data["other_ids"].tolist())))
+            ids = IdIndex(data["numeric_keys"], data["numeric_ids"], other)
+            last_id = ObjectId(data["last_id"].tobytes()) if data["last_id"].size else None
+            return ids, last_id, int(data["count"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_snapshot(path, ids, last_id, count):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Importers may run in parallel processes; give each its own temp file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            numeric_keys=ids.numeric_keys,
+            numeric_ids=ids.numeric_ids,
+            other_keys=np.array(list(ids.other), dtype=str),
+            other_ids=np.array([str(value) for value in ids.other.values()], dtype=str),
+            last_id=np.frombuffer(last_id.binary if last_id else b"", dtype=np.uint8),
+            count=np.int64(count),
+        )
+    os.replace(tmp_path, path)
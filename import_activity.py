@@ -1,192 +1,424 @@
 import os
+import multiprocessing
+import multiprocessing.util
 import pandas as pd
-from pymongo import MongoClient, UpdateOne
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pymongo import MongoClient
 from normalize import parse_date
-import numpy as np
+import re
 from paths import ENGAGEMENT_PATHS, ENGAGEMENT_JOIN_PATHS
+from id_resolver import load_id_map
+from bulk_writer import BulkWriter, WriteTotals
+from csv_cache import load_csv, read_csv
+from metadata_profiles import row_metadata, usecols, SETTINGS as METADATA_SETTINGS
+from instrumentation import RunMetrics
+from checkpoints import Checkpoint
 
-def import_activity(limit=None, dry_run=False):
+# Engagement columns kept in metadata by the "slim" profile: everything the
+# activity fields are built from, plus the raw association ids
+METADATA_COLUMNS = [
+    "EngagementId", "engagement_type", "hs_object_id", "hs_createdate", "hs_lastmodifieddate",
+    "hs_created_by_user_id", "hubspot_owner_id",
+    "hs_call_title", "hs_call_summary", "hs_call_body", "hs_call_status",
+    "hs_meeting_title", "hs_meeting_body", "hs_meeting_outcome",
+    "hs_meeting_start_time", "hs_meeting_end_time",
+    "hs_email_subject", "hs_body_preview", "hs_email_status",
+    "hs_note_body",
+    "hs_task_subject", "hs_task_body", "hs_task_is_completed", "hs_start_date",
+    "VId", "DealId", "CompanyId",
+]
+
+def import_activity(limit=None, dry_run=False, chunk_size=None, jobs=1, resume=False):
     """
     Import multiple engagement CSVs safely, aggregating contacts, deals, and companies per EngagementId,
     and including type-specific fields. Limit applies per engagement type.
+
+    When chunk_size is set, each engagement CSV is streamed in chunks of that many rows. Writes
+    are sent in batches as the rows are transformed, so memory stays bounded by the chunk size.
+
+    With jobs > 1 each engagement file (or chunk) is transformed and written by one of `jobs`
+    worker processes.
+
+    Each engagement CSV's progress is checkpointed after every chunk (or file) whose
+    writes were acknowledged; with resume, a run continues from there as long as the
+    CSVs haven't changed.
     """
+    metrics = RunMetrics("activity")
+    checkpoint = Checkpoint(
+        "activity",
+        ENGAGEMENT_PATHS + list(ENGAGEMENT_JOIN_PATHS.values()),
+        {"limit": limit, "metadata": METADATA_SETTINGS["profile"]},
+        resume=resume,
+        enabled=not dry_run,
+    )
     print("📥 Loading engagement data…")
 
     # Load join tables and aggregate to lists to avoid duplicates
     join_paths = ENGAGEMENT_JOIN_PATHS
 
-    df_contact_assoc = pd.read_csv(join_paths['contact'], dtype=str).fillna("")
-    df_contact_assoc = df_contact_assoc.groupby("EngagementId")["VId"].agg(list).reset_index()
+    contact_links = load_csv(join_paths['contact'])
+    df_contact_assoc = contact_links.groupby("EngagementId")["VId"].agg(list).reset_index()
+
+    deal_links = load_csv(join_paths['deal'])
+    df_deal_assoc = deal_links.groupby("EngagementId")["DealId"].agg(list).reset_index()
 
-    df_deal_assoc = pd.read_csv(join_paths['deal'], dtype=str).fillna("")
-    df_deal_assoc = df_deal_assoc.groupby("EngagementId")["DealId"].agg(list).reset_index()
+    company_links = load_csv(join_paths['company'])
+    df_company_assoc = company_links.groupby("EngagementId")["CompanyId"].agg(list).reset_index()
 
-    df_company_assoc = pd.read_csv(join_paths['company'], dtype=str).fillna("")
-    df_company_assoc = df_company_assoc.groupby("EngagementId")["CompanyId"].agg(list).reset_index()
+    joins = (df_contact_assoc, df_deal_assoc, df_company_assoc)
+    link_rows = len(contact_links) + len(deal_links) + len(company_links)
+    metrics.lap("read_joins", link_rows)
 
     # Mongo setup
     client = MongoClient(os.getenv("MONGODB"))
     db = client[os.getenv("DB_NAME")]
-    contacts_collection = db["contacts"]
-    companies_collection = db["companies"]
-    processes_collection = db["processes"]
     activities_collection = db["activities"]
 
-    # Preload DB objects
-    contacts = {
-        str(c["externalId"]): c["_id"]
-        for c in contacts_collection.find({}, {"externalId": 1})
-        if c.get("externalId")  # Skip if externalId is missing or None
-    }
-    companies = {
-        str(c["externalId"]): c["_id"] 
-        for c in companies_collection.find({}, {"externalId": 1})
-        if c.get("externalId")}
-    processes = {
-        str(p["externalId"]): p["_id"] 
-        for p in processes_collection.find({}, {"externalId": 1})
-        if p.get("externalId")}
-
-    operations = []
-    skipped_rows = 0
+    id_maps = (load_id_map(db, "contacts"), load_id_map(db, "processes"), load_id_map(db, "companies"))
+    metrics.lap("preload_ids", sum(map(len, id_maps)))
+
+    # Resolve every association to Mongo _ids up front, a whole table at a time
+    contacts, processes, companies = id_maps
+    id_maps = (
+        link_ids(contact_links, "VId", contacts),
+        link_ids(deal_links, "DealId", processes),
+        link_ids(company_links, "CompanyId", companies),
+    )
+    metrics.lap("link_ids", link_rows)
+
+    if not dry_run:
+        print("🚀 Streaming activities to MongoDB...")
 
-    # Process each engagement CSV individually
-    for path in ENGAGEMENT_PATHS:
-        print(f"📂 Processing {path}…")
-        df_engagement = pd.read_csv(path, dtype=str).fillna("")
-
-        # Merge with aggregated join tables
-        df_merged = df_engagement.merge(df_contact_assoc, on="EngagementId", how="left") \
-                                 .merge(df_deal_assoc, on="EngagementId", how="left") \
-                                 .merge(df_company_assoc, on="EngagementId", how="left")
-
-        # Apply per-type limit
-        if limit:
-            df_merged = df_merged.head(limit)
-
-        for _, row in df_merged.iterrows():
-            # Map external IDs to Mongo IDs
-            contact_ids = map_ids(row.get("VId"), contacts)
-            process_ids = map_ids(row.get("DealId"), processes)
-            company_ids = map_ids(row.get("CompanyId"), companies)
-
-            if not contact_ids and not process_ids and not company_ids:
-                print(row.get("EngagementId"))
-                skipped_rows += 1
-                continue
-            
-            engagement_id = row.get("EngagementId")
-            if not engagement_id:
-                skipped_rows += 1
-                continue
-
-            engagement_type = row.get('engagement_type', '').strip().lower()
-
-            # Base document
-            activity_doc = {
-                "contact": contact_ids or None,
-                "process": process_ids or None,
-                "company": company_ids or None,
-                "externalId": engagement_id,
-                "source": "HubSpot",
-                "metadata": row.to_dict()
-            }
-
-            # Type-specific fields
-            match engagement_type:
-                case "call":
-                    activity_doc.update({
-                        "type": "call",
-                        "author": row.get("hs_created_by_user_id", None),
-                        "subject": row.get("hs_call_title", row.get("hs_call_summary", "")).strip(),
-                        "content": row.get("hs_call_body", "").strip(),
-                        "status": row.get("hs_call_status", "Completed").strip(),
-                        "dueDate": parse_date(row.get("hs_createdate"))
-                    })
-                case "meeting":
-                    activity_doc.update({
-                        "type": "meeting",
-                        "author": row.get("hs_created_by_user_id", None),
-                        "subject": row.get("hs_meeting_title", "").strip(),
-                        "content": row.get("hs_meeting_body", "").strip(),
-                        "status": row.get("hs_meeting_outcome", "Scheduled").strip(),
-                        "dueDate": parse_date(row.get("hs_meeting_start_time")),
-                        "endDate": parse_date(row.get("hs_meeting_end_time"))
-                    })
-                case "email":
-                    activity_doc.update({
-                        "type": "email",
-                        "author": row.get("hs_created_by_user_id", None),
-                        "subject": row.get("hs_email_subject", "").strip(),
-                        "content": row.get("hs_body_preview", "").strip(),
-                        "status": row.get("hs_email_status", "Sent").strip(),
-                        "dueDate": parse_date(row.get("hs_createdate"))
-                    })
-                case "note":
-                    activity_doc.update({
-                        "type": "note",
-                        "author": row.get("hs_created_by_user_id", None),
-                        "subject": None,
-                        "content": row.get("hs_note_body", "").strip(),
-                        "status": "Completed",
-                        "dueDate": parse_date(row.get("hs_createdate"))
-                    })
-                case "task":
-                    activity_doc.update({
-                        "type": "task",
-                        "author": row.get("hs_created_by_user_id", None),
-                        "subject": row.get("hs_task_subject", "").strip(),
-                        "content": row.get("hs_task_body", "").strip(),
-                        "status": "Completed" if row.get("hs_task_is_completed") == "true" else "Pending",
-                        "dueDate": parse_date(row.get("hs_start_date"))
-                    })
-                case _:
-                    print(f"⚠️ Unknown engagement type '{engagement_type}', skipping.")
-                    skipped_rows += 1
+    if jobs > 1:
+        totals, skipped_rows = import_in_parallel(joins, id_maps, limit, dry_run, chunk_size, jobs, checkpoint)
+        metrics.lap("transform_and_write", totals.operations + totals.unchanged + skipped_rows)
+    else:
+        skipped_rows = 0
+
+        # Process each engagement CSV individually; writes overlap with the transform
+        with BulkWriter(activities_collection, dry_run=dry_run) as writer:
+            for path in ENGAGEMENT_PATHS:
+                if checkpoint.done(path):
+                    print(f"⏩ {path} already imported")
                     continue
+                print(f"📂 Processing {path}…")
+
+                rows = checkpoint.rows(path)
+                frames = read_engagement_csv(path, limit, chunk_size, skip_rows=rows)
+                for df_engagement in metrics.iterate("read_csv", frames):
+                    skipped_rows += write_activities(df_engagement, joins, id_maps, writer)
+                    metrics.lap("transform", len(df_engagement))
+                    rows += len(df_engagement)
+                    if chunk_size:
+                        writer.sync()
+                        checkpoint.save(path, rows)
+
+                writer.sync()
+                checkpoint.save(path, rows, done=True)
+
+        totals = writer.totals
+        metrics.lap("flush_writes", totals.operations)
 
-            operations.append(UpdateOne(
-                {"externalId": engagement_id},
-                {"$set": activity_doc},
-                upsert=True
-            ))
+    checkpoint.complete()
+    metrics.finish(totals)
 
     # Write or dry run
     if dry_run:
-        print(f"🧪 Dry run complete — {len(operations)} activities prepared, {skipped_rows} skipped.")
+        print(f"🧪 Dry run complete — {totals.operations} activities prepared, {skipped_rows} skipped.")
     else:
-        if operations:
-            print(f"🚀 Importing {len(operations)} activities to MongoDB...")
-            activities_collection.bulk_write(operations)
-            print(f"✅ Activities imported. Skipped: {skipped_rows}")
+        if totals.operations or totals.unchanged:
+            print(f"✅ {totals.operations} activities imported ({totals}). Skipped: {skipped_rows}")
         else:
             print("⚠️ No valid activities found.")
 
-def map_ids(csv_value, mapping):
+def write_activities(df_engagement, joins, id_maps, writer):
     """
-    csv_value: scalar, list, or pandas Series/array of values from CSV
-    mapping: dict from externalId -> MongoDB _id
-    Returns a list of MongoDB _ids (empty list if nothing found)
+    Join engagement rows to the association tables, build their activity documents
+    and queue the upserts on writer. Returns the number of skipped rows.
+
+    joins are the raw aggregated association lists (kept in metadata); id_maps are the
+    EngagementId → [_id] links from link_ids.
     """
-    ids = []
+    df_contact_assoc, df_deal_assoc, df_company_assoc = joins
+    skipped_rows = 0
 
-    # Normalize to iterable
-    if csv_value is None or (isinstance(csv_value, float) and pd.isna(csv_value)):
-        return ids
-    if isinstance(csv_value, (list, pd.Series, pd.Index, np.ndarray)):
-        values = csv_value
-    else:
-        values = [csv_value]
+    # Merge with aggregated join tables
+    df_merged = df_engagement.merge(df_contact_assoc, on="EngagementId", how="left") \
+                             .merge(df_deal_assoc, on="EngagementId", how="left") \
+                             .merge(df_company_assoc, on="EngagementId", how="left")
+
+    # Resolved _id lists per row, looked up for the whole column at once
+    engagement_ids = df_merged["EngagementId"]
+    contact_ids, process_ids, company_ids = (
+        engagement_ids.map(links).tolist() for links in id_maps
+    )
 
-    for v in values:
-        if v is None or (isinstance(v, float) and pd.isna(v)):
+    rows = df_merged.to_dict("records")
+    for row, contacts, processes, companies in zip(rows, contact_ids, process_ids, company_ids):
+        activity_doc = build_activity_doc(row, contacts, processes, companies)
+        if not activity_doc:
+            skipped_rows += 1
             continue
-        try:
-            key = str(int(v))
-        except (ValueError, TypeError):
-            key = str(v)
-        obj_id = mapping.get(key)
-        if obj_id:
-            ids.append(obj_id)
-
-    return ids
\ No newline at end of file
+
+        writer.add(
+            {"externalId": activity_doc["externalId"]},
+            {"$set": activity_doc},
+            upsert=True
+        )
+
+    return skipped_rows
+
+# Association tables and ID maps for worker processes. Workers are forked after this
+# is set, so they read the parent's copy instead of each receiving a pickled one.
+_SHARED = {}
+
+# Each worker process's Mongo client and writer, set up once by init_worker and
+# reused by every chunk it handles
+_WORKER = {}
+
+def import_in_parallel(joins, id_maps, limit, dry_run, chunk_size, jobs, checkpoint):
+    """
+    Fan the engagement files (or their chunks) out to `jobs` worker processes, each
+    writing its own batches. Returns the combined WriteTotals and skipped row count.
+
+    Chunks can finish out of order; a file's checkpoint only moves past a chunk once
+    every chunk before it has been written.
+    """
+    _SHARED.update(joins=joins, id_maps=id_maps)
+    totals = WriteTotals()
+    skipped_rows = 0
+    pending = set()
+
+    # future → (path, chunk number); per path: rows written in order, chunks finished
+    # out of order (number → rows), the next chunk expected, and the chunk count once known
+    submitted = {}
+    written = {path: checkpoint.rows(path) for path in ENGAGEMENT_PATHS}
+    finished = {path: {} for path in ENGAGEMENT_PATHS}
+    next_chunk = dict.fromkeys(ENGAGEMENT_PATHS, 0)
+    chunk_counts = {}
+
+    def advance(path):
+        rows = written[path]
+        while next_chunk[path] in finished[path]:
+            rows += finished[path].pop(next_chunk[path])
+            next_chunk[path] += 1
+        if rows != written[path] or next_chunk[path] == chunk_counts.get(path):
+            written[path] = rows
+            checkpoint.save(path, rows, done=next_chunk[path] == chunk_counts.get(path))
+
+    def collect(futures):
+        nonlocal skipped_rows
+        for future in futures:
+            worker_totals, worker_skipped, worker_rows = future.result()
+            totals.combine(worker_totals)
+            skipped_rows += worker_skipped
+            path, number = submitted.pop(future)
+            finished[path][number] = worker_rows
+            advance(path)
+
+    def submit(executor, source, number, **kwargs):
+        future = executor.submit(activity_worker, **kwargs)
+        submitted[future] = (source, number)
+        pending.add(future)
+
+    try:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                 initializer=init_worker, initargs=(dry_run,)) as executor:
+            for path in ENGAGEMENT_PATHS:
+                if checkpoint.done(path):
+                    print(f"⏩ {path} already imported")
+                    continue
+                print(f"📂 Processing {path}…")
+
+                if not chunk_size:
+                    # Workers load whole files themselves (through the CSV cache)
+                    chunk_counts[path] = 1
+                    submit(executor, path, 0, path=path, limit=limit, skip_rows=written[path])
+                    continue
+
+                number = 0
+                for df_engagement in read_engagement_csv(path, limit, chunk_size, skip_rows=written[path]):
+                    # Keep at most two chunks per worker in flight to bound memory
+                    if len(pending) >= jobs * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    submit(executor, path, number, frame=df_engagement)
+                    number += 1
+                chunk_counts[path] = number
+                advance(path)
+
+            collect(pending)
+    finally:
+        _SHARED.clear()
+
+    return totals, skipped_rows
+
+def init_worker(dry_run):
+    """
+    Open the worker process's Mongo client and writer once, so the writer's start-up
+    work (delta fingerprints, existing keys in auto mode) isn't repeated per chunk.
+    They are closed when the process exits.
+    """
+    client = MongoClient(os.getenv("MONGODB"))
+    writer = BulkWriter(client[os.getenv("DB_NAME")]["activities"], dry_run=dry_run)
+    _WORKER.update(client=client, writer=writer)
+
+    def close():
+        writer.close()
+        client.close()
+    multiprocessing.util.Finalize(None, close, exitpriority=10)
+
+def activity_worker(frame=None, path=None, limit=None, skip_rows=0):
+    """
+    Runs in a worker process: writes one file or chunk through the process's writer
+    and waits for MongoDB to acknowledge it. Returns the writes' totals, skipped rows
+    and rows handled.
+    """
+    if frame is None:
+        frame = next(read_engagement_csv(path, limit, skip_rows=skip_rows))
+
+    writer = _WORKER["writer"]
+    skipped_rows = write_activities(frame, _SHARED["joins"], _SHARED["id_maps"], writer)
+    # Acknowledged before the parent checkpoints this chunk
+    writer.sync()
+
+    totals, writer.totals = writer.totals, WriteTotals()
+    return totals, skipped_rows, len(frame)
+
+def read_engagement_csv(path, limit=None, chunk_size=None, skip_rows=0):
+    """
+    Yield an engagement CSV as DataFrames: the whole file at once (through the
+    parsed-CSV cache), or chunk_size rows at a time when streaming. Limit caps the rows read;
+    the first skip_rows rows (already imported, see checkpoints.py) are left out.
+    Under the "slim" metadata profile only METADATA_COLUMNS are parsed.
+    """
+    columns = usecols(METADATA_COLUMNS)
+    if not chunk_size:
+        # A limited run only parses the rows it needs, bypassing the cache
+        df = read_csv(path, columns, nrows=limit).fillna("") if limit else load_csv(path, columns)
+        yield df.iloc[skip_rows:] if skip_rows else df
+        return
+
+    nrows = None if limit is None else max(0, limit - skip_rows)
+    skiprows = range(1, skip_rows + 1) if skip_rows else None
+    with read_csv(path, columns, nrows=nrows, skiprows=skiprows, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield chunk.fillna("")
+
+def build_activity_doc(row, contact_ids, process_ids, company_ids):
+    """
+    Build the activity document for one merged engagement row (a dict), given its
+    resolved contact/process/company _id lists (NaN when it has none).
+    Returns None when the row should be skipped.
+    """
+    contact_ids = contact_ids if isinstance(contact_ids, list) else []
+    process_ids = process_ids if isinstance(process_ids, list) else []
+    company_ids = company_ids if isinstance(company_ids, list) else []
+
+    if not contact_ids and not process_ids and not company_ids:
+        print(row.get("EngagementId"))
+        return None
+
+    engagement_id = row.get("EngagementId")
+    if not engagement_id:
+        return None
+
+    engagement_type = row.get('engagement_type', '').strip().lower()
+
+    # Base document
+    activity_doc = {
+        "contact": contact_ids or None,
+        "process": process_ids or None,
+        "company": company_ids or None,
+        "externalId": engagement_id,
+        "source": "HubSpot",
+        "metadata": row_metadata(row, METADATA_COLUMNS)
+    }
+
+    # Type-specific fields
+    match engagement_type:
+        case "call":
+            activity_doc.update({
+                "type": "call",
+                "author": row.get("hs_created_by_user_id", None),
+                "subject": row.get("hs_call_title", row.get("hs_call_summary", "")).strip(),
+                "content": row.get("hs_call_body", "").strip(),
+                "status": row.get("hs_call_status", "Completed").strip(),
+                "dueDate": parse_date(row.get("hs_createdate"))
+            })
+        case "meeting":
+            activity_doc.update({
+                "type": "meeting",
+                "author": row.get("hs_created_by_user_id", None),
+                "subject": row.get("hs_meeting_title", "").strip(),
+                "content": row.get("hs_meeting_body", "").strip(),
+                "status": row.get("hs_meeting_outcome", "Scheduled").strip(),
+                "dueDate": parse_date(row.get("hs_meeting_start_time")),
+                "endDate": parse_date(row.get("hs_meeting_end_time"))
+            })
+        case "email":
+            activity_doc.update({
+                "type": "email",
+                "author": row.get("hs_created_by_user_id", None),
+                "subject": row.get("hs_email_subject", "").strip(),
+                "content": row.get("hs_body_preview", "").strip(),
+                "status": row.get("hs_email_status", "Sent").strip(),
+                "dueDate": parse_date(row.get("hs_createdate"))
+            })
+        case "note":
+            activity_doc.update({
+                "type": "note",
+                "author": row.get("hs_created_by_user_id", None),
+                "subject": None,
+                "content": row.get("hs_note_body", "").strip(),
+                "status": "Completed",
+                "dueDate": parse_date(row.get("hs_createdate"))
+            })
+        case "task":
+            activity_doc.update({
+                "type": "task",
+                "author": row.get("hs_created_by_user_id", None),
+                "subject": row.get("hs_task_subject", "").strip(),
+                "content": row.get("hs_task_body", "").strip(),
+                "status": "Completed" if row.get("hs_task_is_completed") == "true" else "Pending",
+                "dueDate": parse_date(row.get("hs_start_date"))
+            })
+        case _:
+            print(f"⚠️ Unknown engagement type '{engagement_type}', skipping.")
+            return None
+
+    return activity_doc
+
+def link_ids(df_links, column, mapping):
+    """
+    EngagementId → list of Mongo _ids for one association table, in file order,
+    skipping external IDs that aren't in mapping (an externalId → _id IdIndex).
+    """
+    keys = id_keys(df_links[column])
+    object_ids = pd.Series(mapping.lookup(keys), index=keys.index)
+    linked = pd.DataFrame({"EngagementId": df_links["EngagementId"], "_id": object_ids})
+    linked = linked[linked["_id"].notna()]
+    return linked.groupby("EngagementId", sort=False)["_id"].agg(list)
+
+CANONICAL_ID = re.compile(r"0|[1-9][0-9]*")
+
+def id_keys(values):
+    """
+    Normalize external IDs the way they are stored as keys: str(int(v)) when v is
+    an integer ("007" → "7"), else str(v). Values already in canonical form are
+    left alone; only the rest go through int() one distinct value at a time.
+    """
+    values = values.astype(object)
+    canonical = values.str.fullmatch(CANONICAL_ID.pattern) == True
+    if canonical.all():
+        return values
+
+    odd = pd.unique(values[~canonical])
+    return values.where(canonical, values.map(dict(zip(odd, map(id_key, odd)))))
+
+def id_key(value):
+    try:
+        return str(int(value))
+    except (ValueError, TypeError):
+        return str(value)
@@ -1,11 +1,51 @@
 import requests
+import hashlib
 import os
-import pandas as pd
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from attachment_manifest import AttachmentManifest, MANIFEST_FILE
+from file_metadata_cache import FileMetadataCache, DEFAULT_TTL_HOURS
+from id_resolver import load_id_map, fetch_by_ids
+from bulk_writer import BulkWriter, SETTINGS as WRITER_SETTINGS
 from paths import ENGAGEMENT_PATHS
-from pymongo import MongoClient, UpdateOne
+from pymongo import MongoClient
+from csv_cache import load_csv
+from instrumentation import RunMetrics
+from checkpoints import Checkpoint
 
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 1.0
 
-def download_all_engagement_attachments(limit=None, dry_run=False, update=False):
+# Bytes read from a download at a time
+DOWNLOAD_CHUNK = 1024 * 1024
+
+# Attachments downloaded and saved between two checkpoints
+CHECKPOINT_EVERY = 1000
+
+
+def download_all_engagement_attachments(limit=None, dry_run=False, update=False, workers=1, rate_limit=None,
+                                        resume=False, file_cache_ttl=DEFAULT_TTL_HOURS):
+    """
+    Download every engagement attachment and upsert its file record, CHECKPOINT_EVERY
+    attachments at a time. With resume, a run skips the attachments whose records an
+    earlier run saved, as long as the engagement CSVs haven't changed. The checkpoint
+    never moves past a failed download, and a run with failures keeps it for --resume.
+
+    HubSpot file metadata is cached for file_cache_ttl hours (see file_metadata_cache.py),
+    so an update run only calls the API for files it hasn't seen recently.
+
+    Attachments are never planned: with --plan-out the stage is skipped, as dry-run
+    file records would stand in for downloads that never happened.
+    """
+    if WRITER_SETTINGS["plan_path"]:
+        print("⏭️ Attachments are not planned (their file records need the downloads) — skipping.")
+        return
+
+    metrics = RunMetrics("attachment")
     print("📥 Searching engagement files for attachments...")
 
     # ⚡ Only load Mongo activities once
@@ -13,21 +53,24 @@ def download_all_engagement_attachments(limit=None, dry_run=False, update=False)
     db = client[os.getenv("DB_NAME")]
     activity_collection = db["activities"]
 
-    print("🔍 Preloading activity metadata...")
-    activities = {
-        str(a["externalId"]): a
-        for a in activity_collection.find({}, {"_id": 1, "externalId": 1, "process": 1, "contact": 1})
-        if a.get("externalId")
-    }
+    print("🔍 Preloading activity ids...")
+    activities = load_id_map(db, "activities")
     print(f"   → Loaded {len(activities)} activities")
+    metrics.lap("preload_ids", len(activities))
 
-    attachments = 0
-    file_objs_to_upsert = []
+    # The attachment list also depends on which activities exist
+    checkpoint = Checkpoint("attachment", ENGAGEMENT_PATHS,
+                            {"limit": limit, "update": update, "activities": len(activities)},
+                            resume=resume, enabled=not dry_run)
+
+    # (file_id, activity _id) for every attachment to fetch
+    jobs = []
 
     for path in ENGAGEMENT_PATHS:
         print(f"📂 Checking {path}…")
 
-        df = pd.read_csv(path, dtype=str).fillna("")
+        df = load_csv(path)
+        metrics.lap("read_csv", len(df))
 
         if "hs_attachment_ids" not in df.columns:
             print("   → No 'hs_attachment_ids' column — skipping.")
@@ -50,30 +93,208 @@ def download_all_engagement_attachments(limit=None, dry_run=False, update=False)
                 continue
 
             # Map to activity_id in Mongo
-            activity = activities.get(engagement_external_id)
-            if not activity:
+            activity_id = activities.get(engagement_external_id)
+            if not activity_id:
                 print(f"⚠ No Mongo activity found for externalId={engagement_external_id}")
                 continue
 
             for file_id in attachment_ids:
-                file_obj = download_attachment(file_id, dry_run=dry_run, update=update)
+                jobs.append((file_id, activity_id))
+
+        metrics.lap("collect_attachments", len(df))
+
+    # Jobs are listed in CSV order, so a checkpoint is just how many are done. It stops
+    # advancing at the first slice with a failed download, so --resume retries it.
+    start = checkpoint.rows("attachments")
+    if start:
+        print(f"⏩ Skipping {start} attachments saved by the interrupted run")
+        jobs = jobs[start:]
+
+    # Process/contact links, only for activities that have attachments
+    activity_docs = fetch_by_ids(activity_collection, {activity_id for _, activity_id in jobs}, {"process": 1, "contact": 1})
+    metrics.lap("preload_activities", len(activity_docs))
+
+    print(f"⬇️ Fetching {len(jobs)} attachments with {workers} worker(s)...")
+    saved = 0
+    failed = False
+    with BulkWriter(db["files"], dry_run=dry_run) as writer:
+        for offset in range(0, len(jobs), CHECKPOINT_EVERY):
+            batch = jobs[offset:offset + CHECKPOINT_EVERY]
+            file_objs = download_attachments(
+                [file_id for file_id, _ in batch],
+                dry_run=dry_run,
+                update=update,
+                workers=workers,
+                rate_limit=rate_limit,
+                file_cache_ttl=file_cache_ttl,
+            )
+            metrics.lap("download", len(batch))
+
+            file_objs_to_upsert = []
+            for (file_id, activity_id), file_obj in zip(batch, file_objs):
                 if not file_obj:
                     continue
 
+                activity = activity_docs.get(activity_id, {"_id": activity_id})
+
                 # Attach activity/process/contact metadata
                 file_obj["activity"] = activity.get("_id")
                 file_obj["process"] = activity.get("process")
                 file_obj["contact"] = activity.get("contact")
 
                 file_objs_to_upsert.append(file_obj)
-                
-    save_attachments_batch(file_objs_to_upsert, dry_run=dry_run)
-    print(f"✔ Done. Processed {len(file_objs_to_upsert)} attachments.")
 
+            save_attachments_batch(file_objs_to_upsert, writer)
+            saved += len(file_objs_to_upsert)
+            if not failed and not all(file_objs):
+                failed = True
+                # Saved even for the first slice, so there is a checkpoint to resume from
+                checkpoint.save("attachments", start + offset)
+                print("⚠️ Some downloads failed; the checkpoint stays before them so --resume retries them")
+            if not failed:
+                checkpoint.save("attachments", start + offset + len(batch))
+            metrics.lap("write", len(file_objs_to_upsert))
+
+    client.close()
+    totals = writer.totals
+    if not failed:
+        checkpoint.complete()
+    metrics.finish(totals)
+
+    if dry_run:
+        print(f"[DRY-RUN] Total files: {saved}")
+    elif totals.operations:
+        print(f"✔ Bulk upsert completed: {totals.matched} matched, "
+              f"{totals.inserted + totals.upserted} inserted")
+    print(f"✔ Done. Processed {saved} attachments.")
+
+
+def download_attachments(file_ids, save_dir="./hubspot", dry_run=False, update=False, workers=1, rate_limit=None,
+                         file_cache_ttl=DEFAULT_TTL_HOURS):
+    """
+    Download many attachments over one pooled keep-alive session.
+    Returns the file objects (or None for failures) in the same order as file_ids.
+    A file id listed more than once (one attachment on several engagements) is
+    fetched once, and each position gets its own copy of the file object.
+    rate_limit caps HubSpot API requests per second across all workers.
+
+    Downloads are recorded in a manifest in save_dir; files already downloaded
+    by an earlier run (and still on disk with the right size) are skipped. File
+    metadata from the API is cached, and update runs read it from the cache.
+    Update runs take downloaded files' records (with their real size and checksum)
+    from the manifest, without changing it; other files get HubSpot's size.
+    """
+    session = make_session(workers)
+    limiter = RateLimiter(rate_limit)
+    manifest = None
+    if not dry_run and (not update or os.path.exists(os.path.join(save_dir, MANIFEST_FILE))):
+        manifest = AttachmentManifest(save_dir)
+    metadata_cache = None if dry_run else FileMetadataCache(file_cache_ttl)
+    unique_ids = list(dict.fromkeys(file_ids))
+    total = len(unique_ids)
+    progress_every = max(1, total // 20)
+    done = 0
+    lock = threading.Lock()
+
+    def fetch(file_id):
+        nonlocal done
+        file_obj = download_attachment(
+            file_id, save_dir=save_dir, dry_run=dry_run, update=update,
+            session=session, limiter=limiter, manifest=manifest, metadata_cache=metadata_cache,
+        )
+        if manifest and not file_obj and not update:
+            manifest.record_failed(file_id)
+        with lock:
+            done += 1
+            if done % progress_every == 0 or done == total:
+                print(f"   → {done}/{total} attachments processed")
+        return file_obj
 
-def download_attachment(file_id, save_dir="./hubspot", dry_run=False, update=False):
+    try:
+        if workers <= 1:
+            fetched = [fetch(file_id) for file_id in unique_ids]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fetched = list(executor.map(fetch, unique_ids))
+        by_id = dict(zip(unique_ids, fetched))
+        return [dict(by_id[file_id]) if by_id[file_id] else None for file_id in file_ids]
+    finally:
+        session.close()
+        if manifest:
+            if not update:
+                counts = manifest.counts()
+                print(f"   → Manifest: {counts.get('done', 0)} done, {counts.get('failed', 0)} failed")
+            manifest.close()
+        if metadata_cache:
+            if update:
+                print(f"   → File metadata: {metadata_cache.hits} cached, {metadata_cache.misses} fetched from HubSpot")
+            metadata_cache.close()
+
+
+def make_session(workers=1):
+    """ requests Session whose connection pool is large enough for every worker. """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=max(workers, 10))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RateLimiter:
+    """ Spaces calls to at most `rate` per second, shared across threads. """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def request_with_retry(session, url, limiter=None, max_retries=MAX_RETRIES, **kwargs):
+    """
+    GET url, retrying HTTP 429 responses. Waits for Retry-After when the server
+    sends it, otherwise backs off exponentially.
+    """
+    for attempt in range(max_retries + 1):
+        if limiter:
+            limiter.wait()
+        response = session.get(url, **kwargs)
+        if response.status_code != 429 or attempt == max_retries:
+            return response
+
+        delay = retry_after_seconds(response.headers.get("Retry-After"), attempt)
+        response.close()
+        print(f"⏳ Rate limited, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+        time.sleep(delay)
+
+
+def retry_after_seconds(header, attempt):
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(header)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    return BACKOFF_SECONDS * (2 ** attempt)
+
+
+def download_attachment(file_id, save_dir="./hubspot", dry_run=False, update=False, session=None, limiter=None, manifest=None,
+                        metadata_cache=None):
     """ Returns a file object (real or simulated when dry_run=True). """
     TOKEN = os.getenv("HUBSPOT_API_KEY")
+    session = session or requests
     if not update:
         os.makedirs(save_dir, exist_ok=True)
 
@@ -88,39 +309,36 @@ def download_attachment(file_id, save_dir="./hubspot", dry_run=False, update=Fal
             "externalId": file_id,
         }
 
+    # ---- Already downloaded by an earlier run (also how updates get the real size) ----
+    if manifest:
+        file_obj = manifest.completed(file_id)
+        if file_obj:
+            return file_obj
+
     # ---- Real download ----
     url = f"https://api.hubapi.com/files/v3/files/{file_id}/signed-url"
     headers = {"Authorization": f"Bearer {TOKEN}"}
 
     try:
-        r = requests.get(url, headers=headers)
-        r.raise_for_status()
-        attachment = r.json()
-        signed_url = attachment.get("url")
-
-        if not signed_url:
-            print(f"⚠ No signed URL for file {file_id}")
-            return None
-
-        # Download the actual file content
-        if not update:
-            try:
-                file_data = requests.get(signed_url, allow_redirects=True)
-                file_data.raise_for_status()
-            except requests.RequestException as e:
-                print(f"⚠ Failed to download file {file_id} from signed URL: {e}")
+        # Updates only need the metadata, which the cache may already have
+        attachment = metadata_cache.get(file_id) if metadata_cache and update else None
+        if attachment is None:
+            r = request_with_retry(session, url, limiter=limiter, headers=headers)
+            r.raise_for_status()
+            attachment = r.json()
+
+            if not attachment.get("url"):
+                print(f"⚠ No signed URL for file {file_id}")
                 return None
+            if metadata_cache:
+                metadata_cache.put(file_id, attachment)
+        signed_url = attachment.get("url")
 
         filename = attachment.get("name", f"{file_id}")
         extension = attachment.get("extension")
         filepath = f"{save_dir}/{filename}-{file_id}.{extension}"
 
-        if not update:
-            with open(filepath, "wb") as f:
-                f.write(file_data.content)
-
-        print(f"Downloaded {filepath}")
-        return {
+        file_obj = {
             "name": filename,
             "path": filepath,
             "size": attachment.get("size"),
@@ -129,39 +347,70 @@ def download_attachment(file_id, save_dir="./hubspot", dry_run=False, update=Fal
             "externalId": file_id
         }
 
-    except requests.RequestException as e:
-        print(f"⚠ Failed to get signed URL for file {file_id}: {e}")
-        return None
+        # Download the actual file content
+        if not update:
+            try:
+                with request_with_retry(session, signed_url, allow_redirects=True, stream=True) as file_data:
+                    file_data.raise_for_status()
+                    size, checksum = stream_to_file(file_data, filepath)
+            except (requests.RequestException, OSError) as e:
+                print(f"⚠ Failed to download file {file_id} from signed URL: {e}")
+                return None
 
+            # What is on disk, rather than what HubSpot reported
+            file_obj["size"] = size
+            file_obj["checksum"] = checksum
+            print(f"Downloaded {filepath}")
 
-def save_attachments_batch(file_objs, dry_run=False):
-    if not file_objs:
-        return
+            if manifest:
+                manifest.record_done(file_id, file_obj, size=size, checksum=checksum)
+        return file_obj
 
-    if dry_run:
-        print(f"[DRY-RUN] Total files: {len(file_objs)}")
-        return
-
-    client = MongoClient(os.getenv("MONGODB"))
-    db = client[os.getenv("DB_NAME")]
-    file_collection = db["files"]
+    except requests.RequestException as e:
+        print(f"⚠ Failed to get signed URL for file {file_id}: {e}")
+        return None
 
-    operations = []
 
+def stream_to_file(response, filepath):
+    """
+    Write a streamed response to filepath chunk by chunk, hashing it on the way, so
+    memory stays flat whatever the file size. The data goes to a uniquely named
+    temporary file that replaces filepath only once complete; an interrupted download
+    leaves no partial file behind. Returns (size in bytes, SHA-256 hex digest).
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or ".",
+                                    prefix=f"{os.path.basename(filepath)}.", suffix=".part")
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                f.write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size, sha256.hexdigest()
+
+
+def save_attachments_batch(file_objs, writer):
+    """
+    Queue upserts of the file docs on writer and wait until MongoDB acknowledged them.
+    A size measured on download (docs with a checksum) is always set; HubSpot's size
+    only goes into new records, so it never overwrites a measured one.
+    """
     for file_doc in file_objs:
-        operations.append(
-            UpdateOne(
-                {"externalId": file_doc["externalId"]},  # match key
-                {"$set": file_doc},                     # update fields
-                upsert=True                             # insert if not exists
-            )
+        update = {"$set": file_doc}
+        if "checksum" not in file_doc and "size" in file_doc:
+            file_doc = dict(file_doc)
+            update = {"$set": file_doc, "$setOnInsert": {"size": file_doc.pop("size")}}
+        writer.add(
+            {"externalId": file_doc["externalId"]},  # match key
+            update,                                 # update fields
+            upsert=True                             # insert if not exists
         )
-
-    if operations:
-        result = file_collection.bulk_write(operations, ordered=False)
-        print(f"✔ Bulk upsert completed: {result.matched_count} matched, "
-              f"{result.upserted_count} inserted")
-
-
-
-
+    writer.sync()
@@ -1,7 +1,17 @@
 import os
 import pandas as pd
-from pymongo import UpdateOne, MongoClient
+from pymongo import MongoClient
 from paths import COHORT_CSV
+from bulk_writer import BulkWriter
+from csv_cache import load_csv
+from metadata_profiles import row_metadata, usecols
+from instrumentation import RunMetrics
+
+# Cohort columns kept in metadata.raw by the "slim" profile
+METADATA_COLUMNS = [
+    "CohortsId", "cohort_name_", "class", "cohort_start_date", "cohort_end_date",
+    "hs_object_id", "hs_createdate", "hs_lastmodifieddate", "hubspot_owner_id", "hs_all_team_ids",
+]
 
 
 def detect_cohort_type(cohort):
@@ -19,11 +29,13 @@ def detect_cohort_type(cohort):
 
 
 def import_cohort(limit=None, dry_run=False):
+    metrics = RunMetrics("cohort")
     csv_path = COHORT_CSV
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV file not found: {csv_path}")
     print(f"Loading CSV from {csv_path}...")
-    df = pd.read_csv(csv_path, dtype=str).fillna("")
+    df = load_csv(csv_path, usecols(METADATA_COLUMNS))
+    metrics.lap("read_csv", len(df))
 
     if limit:
         df = df.head(limit)
@@ -32,8 +44,8 @@ def import_cohort(limit=None, dry_run=False):
     db = client[os.getenv("DB_NAME")]
     cohorts = db["cohorts"]
 
-    operations = []
     skipped = 0
+    writer = BulkWriter(cohorts, dry_run=dry_run)
 
     for _, row in df.iterrows():
         # External ID from HubSpot export
@@ -54,7 +66,7 @@ def import_cohort(limit=None, dry_run=False):
             "updatedAt": pd.to_datetime(row.get("hs_lastmodifieddate"), errors="coerce"),
             "ownerId": row.get("hubspot_owner_id"),
             "teamIds": row.get("hs_all_team_ids"),
-            "raw": row.to_dict()
+            "raw": row_metadata(row, METADATA_COLUMNS)
         }
 
         cohort_doc = {
@@ -66,22 +78,24 @@ def import_cohort(limit=None, dry_run=False):
             "metadata": metadata
         }
 
-        operations.append(
-            UpdateOne(
-                {"externalId": external_id},
-                {"$set": cohort_doc},
-                upsert=True
-            )
+        writer.add(
+            {"externalId": external_id},
+            {"$set": cohort_doc},
+            upsert=True
         )
 
+    metrics.lap("transform", len(df))
+
+    totals = writer.close()
+    metrics.lap("flush_writes", totals.operations)
+    metrics.finish(totals)
+
     if dry_run:
-        print(f"🧪 Dry run: would upsert {len(operations)} cohort records.")
+        print(f"🧪 Dry run: would upsert {totals.operations} cohort records.")
         return
 
-    if not operations:
+    if not totals.operations and not totals.unchanged:
         print("⚠️ No valid cohort records found.")
         return
 
-    
-    result = cohorts.bulk_write(operations)
-    print(f"✅ Upserted {result.upserted_count}, modified {result.modified_count} cohort records.")
+    print(f"✅ Upserted {totals.inserted + totals.upserted}, modified {totals.modified} cohort records.")
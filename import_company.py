@@ -1,17 +1,22 @@
 import os
-import pandas as pd
-from pymongo import MongoClient, UpdateOne
+from pymongo import MongoClient
 from normalize import normalize_phone, parse_date
 from paths import COMPANY_CSV, COMPANY_JOIN_PATHS
 from constants import OWNER_ID_TO_CONTACT_ID
+from id_resolver import load_id_map
+from bulk_writer import BulkWriter
+from csv_cache import load_csv
+from instrumentation import RunMetrics
 
 def import_company(limit=None, dry_run=False):
     path = COMPANY_CSV
     join = COMPANY_JOIN_PATHS
+    metrics = RunMetrics("company")
     print(f"📥 Loading Companies from: {path}")
 
     # Load main CSV
-    df_company = pd.read_csv(path, dtype=str).fillna("")
+    df_company = load_csv(path)
+    metrics.lap("read_csv", len(df_company))
     if limit:
         df_company = df_company.head(limit)
 
@@ -19,28 +24,26 @@ def import_company(limit=None, dry_run=False):
     client = MongoClient(os.getenv("MONGODB"))
     db = client[os.getenv("DB_NAME")]
     company_collection = db["companies"]
-    contact_collection = db["contacts"]
 
     # --- 🔥 Preload all contacts into memory (fast lookup) ---
     print("⚡ Preloading contacts from database...")
-    contacts = {
-        str(c["externalId"]): c["_id"]
-        for c in contact_collection.find({}, {"externalId": 1})
-        if c.get("externalId")  # Skip if externalId is missing or None
-    }
+    contacts = load_id_map(db, "contacts")
     print(f"   → Loaded {len(contacts)} contacts")
+    metrics.lap("preload_ids", len(contacts))
 
     company_contact_map = {}
     if join:
-        df_join = pd.read_csv(join, dtype=str).fillna("")
-        for _, row in df_join.iterrows():
-            company_id = str(row.get("CompanyId", "")).strip()
-            vid = str(row.get("VId", "")).strip()
-            if company_id and vid and vid in contacts:
-                company_contact_map.setdefault(company_id, []).append(contacts[vid])
-
-    operations = []
+        df_join = load_csv(join)
+        metrics.lap("read_csv", len(df_join))
+        company_ids = df_join["CompanyId"].astype(object).str.strip()
+        contact_ids = contacts.lookup(df_join["VId"].astype(object).str.strip())
+        for company_id, contact_id in zip(company_ids, contact_ids):
+            if company_id and contact_id is not None:
+                company_contact_map.setdefault(company_id, []).append(contact_id)
+        metrics.lap("join_contacts", len(df_join))
+
     skipped = 0
+    writer = BulkWriter(company_collection, dry_run=dry_run)
 
     for _, row in df_company.iterrows():
         company_id = str(row.get("CompanyId")).strip()
@@ -129,23 +132,25 @@ def import_company(limit=None, dry_run=False):
             },
         }
 
-        operations.append(
-            UpdateOne(
-                {"externalId": company_id},
-                {"$set": company_doc},
-                upsert=True,
-            )
+        writer.add(
+            {"externalId": company_id},
+            {"$set": company_doc},
+            upsert=True,
         )
 
+    metrics.lap("transform", len(df_company))
+
+    # --- Finish writes (they run alongside the loop above) ---
+    totals = writer.close()
+    metrics.lap("flush_writes", totals.operations)
+    metrics.finish(totals)
+
     # --- Dry run ---
     if dry_run:
-        print(f"🧪 Dry run: {len(operations)} operations, {skipped} skipped")
+        print(f"🧪 Dry run: {totals.operations} operations, {skipped} skipped")
         return
 
-    # --- Execute bulk write ---
-    if operations:
-        print(f"🚀 Writing {len(operations)} companies…")
-        company_collection.bulk_write(operations)
-        print(f"✅ Company import complete")
+    if totals.operations or totals.unchanged:
+        print(f"✅ Company import complete: {totals.operations} companies ({totals})")
     else:
         print("⚠️ No valid companies found.")
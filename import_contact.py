@@ -1,45 +1,28 @@
 import os
 import pandas as pd
-from pymongo import MongoClient, UpdateOne
-from normalize import normalize_email, normalize_phone, parse_date, normalize_bool
+from pymongo import MongoClient
+from normalize import (
+    normalize_email, normalize_phone, parse_date, normalize_bool,
+    normalize_emails, normalize_phones, parse_dates, normalize_bools,
+)
 from constants import OWNER_ID_TO_CONTACT_ID
 from paths import CONTACT_CSV, PROCESS_CSV, PROCESS_JOIN_PATHS
+from bulk_writer import BulkWriter
+from csv_cache import load_csv
+from instrumentation import RunMetrics
 
 def import_contact(limit=None, dry_run=False):
+    metrics = RunMetrics("contact")
     print(f"📥 Loading contacts from {CONTACT_CSV}...")
 
-    df_contacts = pd.read_csv(CONTACT_CSV, dtype=str).fillna("")
-    df_deals = pd.read_csv(PROCESS_CSV, dtype=str).fillna("")
-    df_assoc = pd.read_csv(PROCESS_JOIN_PATHS[0], dtype=str).fillna("")
+    df_contacts = load_csv(CONTACT_CSV)
+    df_deals = load_csv(PROCESS_CSV)
+    df_assoc = load_csv(PROCESS_JOIN_PATHS[0])
+    metrics.lap("read_csv", len(df_contacts) + len(df_deals) + len(df_assoc))
 
     if limit:
         df_contacts = df_contacts.head(limit)
 
-    # ----------------------------
-    # Build DealId → funding map
-    # ----------------------------
-    print("⚡ Preloading deal funding info...")
-    deal_funding = {
-        row["DealId"]: {
-            "fundingProvider": row.get("approved_funding_partner", "").strip() or None,
-            "fundingStatus": row.get("funding_status", "").strip() or None,
-        }
-        for _, row in df_deals.iterrows()
-        if row.get("DealId")
-    }
-
-    # ------------------------------------
-    # Build VId → DealId association map
-    # ------------------------------------
-    print("⚡ Preloading contact ↔ deal associations...")
-    contact_to_deal = {}
-
-    for _, row in df_assoc.iterrows():
-        vid = row.get("VId", "").strip()
-        deal_id = row.get("DealId", "").strip()
-        if vid and deal_id and vid not in contact_to_deal:
-            contact_to_deal[vid] = deal_id  # first deal wins
-
     # ----------------------------
     # Mongo setup
     # ----------------------------
@@ -47,47 +30,43 @@ def import_contact(limit=None, dry_run=False):
     db = client[os.getenv("DB_NAME")]
     contacts_col = db["contacts"]
 
-    operations = []
-    skipped = 0
-    age_update = 0
-
     # ----------------------------
     # Transform + upsert
     # ----------------------------
-    for _, row in df_contacts.iterrows():
-        vid = row.get("VId", "").strip()
+    print("⚡ Joining contacts to deal funding info...")
+    funding = contact_funding(df_contacts, df_deals, df_assoc)
+    metrics.lap("join_funding", len(df_contacts))
 
-        deal_id = contact_to_deal.get(vid)
-        funding = deal_funding.get(deal_id, {}) if deal_id else {}
-        age_range = row.get("age_group", "").strip()
-        if age_range:
-            age_update += 1
+    print("⚙️ Transforming contacts...")
+    docs = transform_contacts(df_contacts, funding)
+    metrics.lap("transform", len(docs))
 
-        
+    age_update = int((_column(df_contacts, "age_group").str.strip() != "").sum())
 
-        doc = transform_row(row, funding)
+    if not dry_run and any(docs):
+        print("🚀 Importing contacts...")
 
-        if not doc or not doc.get("email"):
-            skipped += 1
-            continue
+    with BulkWriter(contacts_col, dry_run=dry_run) as writer:
+        for doc in docs:
+            if doc:
+                writer.add(
+                    {"email": doc["email"]},
+                    {"$set": doc},
+                    upsert=True
+                )
 
-        operations.append(
-            UpdateOne(
-                {"email": doc["email"]},
-                {"$set": doc},
-                upsert=True
-            )
-        )
+    totals = writer.totals
+    metrics.lap("write", totals.operations)
+    metrics.finish(totals)
+    # Invalid rows; the ones --delta dropped as unchanged are counted in totals
+    skipped = len(docs) - totals.operations - totals.unchanged
 
     if dry_run:
-        print(f"🧪 Dry run — {len(operations)} upserts prepared, {skipped} skipped, {age_update} updated age_range.")
+        print(f"🧪 Dry run — {totals.operations} upserts prepared, {skipped} skipped, {age_update} updated age_range.")
         return
 
-    if operations:
-        print(f"🚀 Importing {len(operations)} contacts...")
-        result = contacts_col.bulk_write(operations)
-        total = (result.upserted_count or 0) + (result.modified_count or 0)
-        print(f"✅ {total} contacts inserted/updated")
+    if totals.operations or totals.unchanged:
+        print(f"✅ {totals.inserted + totals.upserted + totals.modified} contacts inserted/updated ({totals})")
         print(f"⚙️ Skipped: {skipped}")
     else:
         print("⚠️ No valid contacts to import.")
@@ -139,3 +118,139 @@ def transform_row(row, funding):
         "timezone": "America/Chicago",
         "source": row.get("source", "").strip() or "Hubspot",
     }
+
+
+def contact_funding(df_contacts, df_deals, df_assoc):
+    """
+    Vectorized VId → DealId → funding lookup.
+    Returns a DataFrame aligned to df_contacts with fundingProvider and fundingStatus
+    columns (None where the contact has no deal or the deal has no funding info).
+    """
+    # VId → DealId, first deal wins
+    assoc = pd.DataFrame({
+        "VId": _column(df_assoc, "VId").str.strip(),
+        "DealId": _column(df_assoc, "DealId").str.strip(),
+    })
+    assoc = assoc[(assoc["VId"] != "") & (assoc["DealId"] != "")]
+    assoc = assoc.drop_duplicates("VId", keep="first")
+
+    # DealId → funding, last row wins for duplicate deals
+    deals = pd.DataFrame({
+        "DealId": _column(df_deals, "DealId"),
+        "fundingProvider": _column(df_deals, "approved_funding_partner").str.strip(),
+        "fundingStatus": _column(df_deals, "funding_status").str.strip(),
+    })
+    deals = deals[deals["DealId"] != ""].drop_duplicates("DealId", keep="last")
+
+    funding = pd.DataFrame({"VId": _column(df_contacts, "VId").str.strip()}) \
+        .merge(assoc, on="VId", how="left") \
+        .merge(deals, on="DealId", how="left")
+
+    return pd.DataFrame({
+        "fundingProvider": _blank_to_none(funding["fundingProvider"]),
+        "fundingStatus": _blank_to_none(funding["fundingStatus"]),
+    })
+
+
+def transform_contacts(df_contacts, funding):
+    """
+    Columnar equivalent of transform_row: builds every contact field with whole-column
+    operations and returns one document per row (None where the email is invalid).
+    """
+    def strip(name, default=""):
+        return _column(df_contacts, name, default).str.strip()
+
+    first = strip("firstname")
+    last = strip("lastname")
+    city = strip("city")
+    state = strip("state")
+
+    email = normalize_emails(_column(df_contacts, "email", None))
+
+    owner = strip("hs_all_owner_ids").map(OWNER_ID_TO_CONTACT_ID)
+
+    full_name = (first + " " + last).str.strip()
+    display_name = full_name.where((first != "") | (last != ""), email)
+
+    location = city.where(state == "", city + ", " + state).where(city != "", state)
+
+    # `phone or mobilephone`
+    phone = _column(df_contacts, "phone", None)
+    phone = phone.where(phone.notna() & (phone != ""), _column(df_contacts, "mobilephone", None))
+    phone = normalize_phones(phone)
+
+    # Kept as a list so unparseable dates stay exactly what parse_date returns
+    graduation_date = parse_dates(_column(df_contacts, "graduation_date", None)).tolist()
+
+    graduated = normalize_bools(_column(df_contacts, "graduated_", None))
+
+    columns = {
+        "firstName": first,
+        "lastName": last,
+        "displayName": display_name,
+        "email": email,
+        "owner": owner,
+        "phone": phone,
+        "type": _or_default(strip("contact_type", "Student"), "Student"),
+        "city": city,
+        "state": state,
+        "postalCode": strip("zip"),
+        "country": _or_default(strip("country", "USA"), "USA"),
+        "graduationDate": graduation_date,
+        "graduationStatus": graduated.map({True: "Graduated", False: ""}),
+        "gender": strip("gender"),
+        "ethnicity": strip("ethnicity"),
+        "disabledStatus": strip("disability"),
+        "veteranStatus": _or_default(strip("veteran_status"), "Not Applicable"),
+        "externalId": strip("VId"),
+        "fundingProvider": funding["fundingProvider"],
+        "fundingStatus": funding["fundingStatus"],
+        "location": location,
+        "ageRange": strip("age_group"),
+        "active": True,
+        "deleted": False,
+        "confirmed": False,
+        "timezone": "America/Chicago",
+        "source": _or_default(strip("source"), "Hubspot"),
+    }
+
+    keys = list(columns)
+    values = []
+    for value in columns.values():
+        if isinstance(value, pd.Series):
+            values.append(_to_objects(value))
+        elif isinstance(value, list):
+            values.append(value)
+        else:
+            values.append([value] * len(df_contacts))
+
+    email_values = values[keys.index("email")]
+    return [
+        dict(zip(keys, row)) if email_values[i] else None
+        for i, row in enumerate(zip(*values))
+    ]
+
+
+def _column(df, name, default=""):
+    """
+    Column as a Series of Python strings, or a constant Series when the column is absent
+    (like row.get). Object dtype keeps str.strip() semantics even for Arrow-backed frames.
+    """
+    if name in df.columns:
+        return df[name].astype(object)
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+
+def _or_default(series, default):
+    return series.where(series != "", default)
+
+
+def _blank_to_none(series):
+    return series.where(series.notna() & (series != ""), None)
+
+
+def _to_objects(series):
+    """ Plain Python list with None in place of missing values. """
+    values = series.astype(object)
+    return values.where(values.notna(), None).tolist()
+
@@ -1,14 +1,19 @@
 import os
-import pandas as pd
-from pymongo import MongoClient, UpdateOne
+from pymongo import MongoClient
 from datetime import datetime
 from paths import CONTACT_COHORT_CSV
+from id_resolver import load_id_map, fetch_by_ids
+from bulk_writer import BulkWriter
+from csv_cache import load_csv
+from instrumentation import RunMetrics
 
 def import_contact_cohort_links(limit=None, dry_run=False):
+    metrics = RunMetrics("contact-cohort")
     print("📥 Importing Contact ↔ Cohort associations...")
 
     # Load CSV
-    df = pd.read_csv(CONTACT_COHORT_CSV, dtype=str).fillna("")
+    df = load_csv(CONTACT_COHORT_CSV)
+    metrics.lap("read_csv", len(df))
 
     if limit:
         df = df.head(limit)
@@ -18,25 +23,21 @@ def import_contact_cohort_links(limit=None, dry_run=False):
     db = client[os.getenv("DB_NAME")]
 
     contacts_col = db["contacts"]
-    cohorts_col = db["cohorts"]
     cc_col = db["cohortcontacts"]
 
     # Preload contacts + cohorts
     print("   → Preloading contacts...")
-    contacts = {
-        str(c["externalId"]): c  
-        for c in contacts_col.find({}, {"externalId": 1, "graduationDate": 1})
-        if c.get("externalId")
-    }
+    contacts = load_id_map(db, "contacts")
+
+    # Graduation dates, only for the contacts linked in this file
+    linked_ids = {object_id for object_id in contacts.lookup(df["VId"].str.strip()) if object_id is not None}
+    graduation = fetch_by_ids(contacts_col, linked_ids, {"graduationDate": 1})
 
     print("   → Preloading cohorts...")
-    cohorts = {
-        str(c["externalId"]): c["_id"]
-        for c in cohorts_col.find({}, {"externalId": 1})
-        if c.get("externalId")
-    }
+    cohorts = load_id_map(db, "cohorts")
+    metrics.lap("preload_ids", len(contacts) + len(cohorts) + len(graduation))
 
-    ops = []
+    writer = BulkWriter(cc_col, dry_run=dry_run)
     missing_contacts = 0
     missing_cohorts = 0
 
@@ -46,10 +47,10 @@ def import_contact_cohort_links(limit=None, dry_run=False):
         cohort_external = row["CohortsId"].strip()
         role = row.get("LabelContactTocohorts", "").strip() or "Student"
 
-        contact = contacts.get(vid)
+        contact_id = contacts.get(vid)
         cohort_id = cohorts.get(cohort_external)
 
-        if not contact:
+        if not contact_id:
             missing_contacts += 1
             print(f"⚠️  Missing contact externalId {vid}")
             continue
@@ -60,10 +61,10 @@ def import_contact_cohort_links(limit=None, dry_run=False):
             continue
 
         # Optional graduation date
-        completion_date = contact.get("graduationDate") or None
+        completion_date = graduation.get(contact_id, {}).get("graduationDate") or None
 
         update_doc = {
-            "contact": contact["_id"],
+            "contact": contact_id,
             "cohort": cohort_id,
             "role": role,
             "status": "Graduated",
@@ -72,24 +73,24 @@ def import_contact_cohort_links(limit=None, dry_run=False):
 
         if dry_run:
             print("DRY RUN → Would UPSERT:", update_doc)
-            continue
 
-        # Build bulk UPSERT operation
-        ops.append(
-            UpdateOne(
-                {"contact": contact["_id"], "cohort": cohort_id},  # unique pair
-                {"$set": update_doc},
-                upsert=True
-            )
+        # Queue bulk UPSERT operation (a dry-run writer only counts it, or saves it to the plan)
+        writer.add(
+            {"contact": contact_id, "cohort": cohort_id},  # unique pair
+            {"$set": update_doc},
+            upsert=True
         )
 
-    # Execute bulk write
-    if not dry_run and ops:
-        print(f"🚀 Executing bulk write with {len(ops)} operations...")
-        result = cc_col.bulk_write(ops, ordered=False)
-        print("Bulk write result:", result.bulk_api_result)
+    metrics.lap("transform", len(df))
+
+    # Finish the bulk writes
+    totals = writer.close()
+    metrics.lap("flush_writes", totals.operations)
+    metrics.finish(totals)
+    if not dry_run and totals.operations:
+        print("Bulk write result:", totals)
 
     print("\n✅ Import complete!")
-    print(f"Upserts attempted: {len(ops)}")
+    print(f"Upserts attempted: {totals.operations}")
     print(f"Missing contacts: {missing_contacts}")
     print(f"Missing cohorts: {missing_cohorts}")
\ No newline at end of file
@@ -1,23 +1,24 @@
 import os
-import pandas as pd
 import copy
-from pymongo import MongoClient, UpdateOne
+from pymongo import MongoClient
 from bson import ObjectId
 from constants import DEALSTAGE_TO_STAGE, TRACTION_LEVELS, OWNER_ID_TO_CONTACT_ID
 from paths import PROCESS_CSV, PROCESS_JOIN_PATHS
+from id_resolver import load_id_map
+from bulk_writer import BulkWriter
+from csv_cache import load_csv
+from instrumentation import RunMetrics
 
 def import_process(limit=None, dry_run=False):
     path = PROCESS_CSV
     join_files = PROCESS_JOIN_PATHS
 
+    metrics = RunMetrics("process")
     print(f"📥 Loading Processes from: {path}")
 
     # --- Load main CSV ---
-    df = pd.read_csv(path, dtype=str).fillna("")
-    join_cohort = join_files[1]
-
-    print(f"🔗 Loading cohort associations: {join_cohort}")
-    df_cohort_join = pd.read_csv(join_cohort, dtype=str).fillna("")
+    df = load_csv(path)
+    metrics.lap("read_csv", len(df))
 
     if limit:
         df = df.head(limit)
@@ -28,26 +29,24 @@ def import_process(limit=None, dry_run=False):
     client = MongoClient(os.getenv("MONGODB"))
     db = client[os.getenv("DB_NAME")]
     process_collection = db["processes"]
-    contact_collection = db["contacts"]
-    cohort_collection = db["cohorts"]
 
     # --- Preload contacts and cohorts ---
     print("⚡ Preloading contacts and cohorts from database...")
-    contacts = {
-        str(c["externalId"]): c["_id"]
-        for c in contact_collection.find({}, {"externalId": 1})
-        if c.get("externalId")  # Skip if externalId is missing or None
-    }
-    cohorts = {str(c["externalId"]): c["_id"] for c in cohort_collection.find({}, {"externalId": 1})}
+    contacts = load_id_map(db, "contacts")
+    cohorts = load_id_map(db, "cohorts")
+    metrics.lap("preload_ids", len(contacts) + len(cohorts))
     
-    df_contact_join = pd.read_csv(join_files[0], dtype=str).fillna("")
-    df_cohort_join = pd.read_csv(join_files[1], dtype=str).fillna("")
+    df_contact_join = load_csv(join_files[0])
+    print(f"🔗 Loading cohort associations: {join_files[1]}")
+    df_cohort_join = load_csv(join_files[1])
+    metrics.lap("read_csv", len(df_contact_join) + len(df_cohort_join))
 
     contact_map = {row["DealId"]: row["VId"] for _, row in df_contact_join.iterrows()}
     cohort_map  = {row["DealId"]: row["CohortsId"] for _, row in df_cohort_join.iterrows()}
+    metrics.lap("join_associations", len(df_contact_join) + len(df_cohort_join))
 
-    operations = []
     skipped = 0
+    writer = BulkWriter(process_collection, dry_run=dry_run)
 
     for _, row in df.iterrows():
         process_name = row.get("dealname")
@@ -98,23 +97,29 @@ def import_process(limit=None, dry_run=False):
             "reason": row.get("reason", "").strip() or None,
         }
 
-        operations.append(
-            UpdateOne(
-                {"externalId": row.get("DealId")},  # or use externalId if you track it
-                {"$set": process_doc},
-                upsert=True,
-            )
+        # Stage ids are new on every run, so leave them out of the delta fingerprint
+        fingerprint_doc = {**process_doc, "stages": [stage_obj] if stage_obj else [], "currentStage": None}
+
+        writer.add(
+            {"externalId": row.get("DealId")},  # or use externalId if you track it
+            {"$set": process_doc},
+            upsert=True,
+            fingerprint_source=fingerprint_doc,
         )
 
+    metrics.lap("transform", len(df))
+
+    # --- Finish writes (they run alongside the loop above) ---
+    totals = writer.close()
+    metrics.lap("flush_writes", totals.operations)
+    metrics.finish(totals)
+
     # --- Dry run ---
     if dry_run:
-        print(f"🧪 Dry run: {len(operations)} operations, {skipped} skipped")
+        print(f"🧪 Dry run: {totals.operations} operations, {skipped} skipped")
         return
 
-    # --- Execute bulk write ---
-    if operations:
-        print(f"🚀 Writing {len(operations)} processes…")
-        process_collection.bulk_write(operations)
-        print(f"✅ Process import complete, skipped {skipped} rows")
+    if totals.operations or totals.unchanged:
+        print(f"✅ Process import complete: {totals.operations} processes ({totals}), skipped {skipped} rows")
     else:
         print("⚠️ No valid processes found.")
@@ -0,0 +1,145 @@
+import os
+
+# pymongo is imported inside the functions that use it, so that main.py (which
+# imports bulk_writer, and through it this module) starts without it
+
+# Collection → indexes on the keys the importers match and look up by.
+# (keys, unique, partial): keys the importers upsert by are unique; contacts are
+# upserted by email, so their externalId index only serves the externalId → _id
+# lookups. Documents created by the app have no externalId (and may have no email),
+# so unique indexes on those fields are partial: they only cover documents that
+# have the field, and any number of documents can leave it out.
+REQUIRED_INDEXES = {
+    "contacts": [(["email"], True, True), (["externalId"], False, False)],
+    "companies": [(["externalId"], True, True)],
+    "processes": [(["externalId"], True, True)],
+    "cohorts": [(["externalId"], True, True)],
+    "activities": [(["externalId"], True, True)],
+    "files": [(["externalId"], True, True)],
+    "cohortcontacts": [(["contact", "cohort"], True, False)],
+}
+
+# Collections already checked by this process: (full name, create). A check that
+# created the missing indexes also covers later checks that only verify them.
+_VERIFIED = set()
+
+
+def ensure_indexes(db, create=True):
+    """
+    Verify (and unless create is False, create) every required index. Prints one
+    line per index and returns the problems found, empty when all are in place.
+    """
+    problems = []
+    for name in REQUIRED_INDEXES:
+        for problem in check_collection(db[name], create):
+            problems.append(f"{name}: {problem}")
+    return problems
+
+
+def preflight(collection, create=True):
+    """
+    Check a collection's required indexes once per process before writing to it,
+    creating missing ones when create is set. Problems are printed as warnings.
+    """
+    if collection.name not in REQUIRED_INDEXES:
+        return
+    if (collection.full_name, create) in _VERIFIED or (collection.full_name, True) in _VERIFIED:
+        return
+    _VERIFIED.add((collection.full_name, create))
+    for problem in check_collection(collection, create, quiet=True):
+        print(f"⚠️ {collection.name}: {problem}")
+
+
+def check_collection(collection, create=True, quiet=False):
+    from pymongo.errors import OperationFailure
+    problems = []
+    existing = index_keys(collection)
+
+    for fields, unique, partial in REQUIRED_INDEXES.get(collection.name, []):
+        label = f"({', '.join(fields)}){' unique' if unique else ''}{' partial' if partial else ''}"
+        wanted_filter = partial_filter(fields) if partial else None
+        found = existing.get(tuple(fields))
+
+        if found is not None and found == (unique, wanted_filter):
+            if not quiet:
+                print(f"✅ {collection.name} {label}")
+            continue
+
+        if found is not None:
+            found_unique, found_filter = found
+            if not unique and not found_unique and found_filter is None:
+                # A plain index serves the lookups just as well
+                if not quiet:
+                    print(f"✅ {collection.name} {label}")
+                continue
+            problems.append(
+                f"index on ({', '.join(fields)}) exists with other options "
+                f"(unique={found_unique}, partialFilterExpression={found_filter}); "
+                f"it should be {label}. Drop it and run `indexes` again"
+            )
+            continue
+
+        if not create:
+            problems.append(f"missing index {label}")
+            continue
+
+        options = {"unique": unique}
+        if wanted_filter:
+            options["partialFilterExpression"] = wanted_filter
+        try:
+            collection.create_index([(field, 1) for field in fields], **options)
+            existing[tuple(fields)] = (unique, wanted_filter)
+            print(f"🛠️ Created {collection.name} {label}")
+        except OperationFailure as e:
+            # e.g. duplicate keys already in the collection
+            problems.append(f"could not create {label}: {e}")
+
+    return problems
+
+
+def partial_filter(fields):
+    """ The partialFilterExpression of a partial index on fields: documents that have them. """
+    return {field: {"$exists": True} for field in fields}
+
+
+def index_keys(collection):
+    """ Key fields (tuple) → (unique, partialFilterExpression or None), for every index on the collection. """
+    return {
+        tuple(field for field, _ in info["key"]): (
+            bool(info.get("unique")),
+            dict(info["partialFilterExpression"]) if info.get("partialFilterExpression") else None,
+        )
+        for info in collection.index_information().values()
+    }
+
+
+def has_index(collection, fields):
+    """
+    Whether some index starts with exactly these fields (in any order) and covers
+    the importers' equality matches on them: a full index, or a partial one on
+    documents that have the fields (see REQUIRED_INDEXES).
+    """
+    wanted = set(fields)
+    return any(
+        set(keys[:len(wanted)]) == wanted
+        and (found_filter is None or found_filter == partial_filter(keys[:len(wanted)]))
+        for keys, (_, found_filter) in index_keys(collection).items()
+    )
+
+
+def run_indexes_command(dry_run=False):
+    """ The `indexes` command. Returns True when every index is in place. """
+    from pymongo import MongoClient
+    client = MongoClient(os.getenv("MONGODB"))
+    db = client[os.getenv("DB_NAME")]
+
+    print("🔎 Checking indexes on import match keys...")
+    problems = ensure_indexes(db, create=not dry_run)
+    client.close()
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        return False
+    print("✅ All import indexes are in place.")
+    return True
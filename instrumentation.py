@@ -0,0 +1,123 @@
+import cProfile
+import json
+import os
+import pstats
+import time
+from datetime import datetime, timezone
+
+# main.py sets metrics_path from the CLI via configure(); when set, every run's
+# metrics are also appended to that file as one JSON line
+SETTINGS = {"metrics_path": None}
+
+
+def configure(metrics_path=None):
+    if metrics_path is not None:
+        SETTINGS["metrics_path"] = metrics_path
+
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.rows = None
+
+    def add_rows(self, count):
+        self.rows = (self.rows or 0) + count
+
+    def as_dict(self):
+        result = {"stage": self.name, "seconds": round(self.seconds, 4), "rows": self.rows}
+        if self.rows is not None and self.seconds:
+            result["rows_per_sec"] = round(self.rows / self.seconds, 1)
+        return result
+
+
+class RunMetrics:
+    """
+    Wall time, row count and throughput per stage of one import. Each lap() closes
+    a stage that began at the previous lap (or at the start); recording the same
+    stage again adds to it.
+
+        metrics = RunMetrics("company")
+        df = load_csv(path)
+        metrics.lap("read_csv", len(df))
+        ...
+        totals = writer.close()
+        metrics.lap("flush_writes", totals.operations)
+        metrics.finish(totals)
+    """
+
+    def __init__(self, importer):
+        self.importer = importer
+        self.stages = {}
+        self.start = self.mark = time.perf_counter()
+        # Time since the last lap already recorded by iterate()
+        self.nested = 0.0
+
+    def lap(self, name, rows=None):
+        now = time.perf_counter()
+        self.record(name, now - self.mark - self.nested, rows)
+        self.mark, self.nested = now, 0.0
+
+    def record(self, name, seconds, rows=None):
+        stage = self.stages.setdefault(name, Stage(name))
+        stage.seconds += seconds
+        if rows is not None:
+            stage.add_rows(rows)
+
+    def iterate(self, name, frames):
+        """
+        Yield from frames (DataFrames), recording the time spent reading each one
+        and its rows under name, apart from whatever stage the loop body is in.
+        """
+        frames = iter(frames)
+        while True:
+            start = time.perf_counter()
+            frame = next(frames, None)
+            seconds = time.perf_counter() - start
+            self.nested += seconds
+            if frame is None:
+                self.record(name, seconds)
+                return
+            self.record(name, seconds, len(frame))
+            yield frame
+
+    def finish(self, totals=None):
+        """ Print the metrics as JSON (and append them to SETTINGS["metrics_path"]). """
+        result = {
+            "importer": self.importer,
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - self.start, 4),
+            "stages": [stage.as_dict() for stage in self.stages.values()],
+        }
+        if totals is not None:
+            # bulk_write runs on the writer threads alongside the other stages, so its
+            # time is summed over threads rather than part of the wall-clock stages
+            result["bulk_write"] = {
+                "seconds": round(totals.write_seconds, 4),
+                "operations": totals.operations,
+                "batches": totals.batches,
+                "unchanged": totals.unchanged,
+                "failed": totals.failed,
+            }
+
+        line = json.dumps(result)
+        print(f"📈 {line}")
+        if SETTINGS["metrics_path"]:
+            directory = os.path.dirname(SETTINGS["metrics_path"])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(SETTINGS["metrics_path"], "a") as f:
+                f.write(line + "\n")
+        return result
+
+
+def profile_call(path, func, *args):
+    """ Run func under cProfile, save the stats to path and print the top entries. """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        profiler.dump_stats(path)
+        print(f"\n🔬 Profile written to {path} (open with: python -m pstats {path})")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
@@ -1,28 +1,57 @@
 import os
+import sys
 import argparse
-import pandas as pd
-from pymongo import MongoClient, UpdateOne 
 from dotenv import load_dotenv
-from import_contact import import_contact
-from import_activity import import_activity
-from import_cohort import import_cohort
-from import_company import import_company
-from import_process import import_process
-from import_attachments import download_all_engagement_attachments
-from import_contact_cohort_association import import_contact_cohort_links
-from updates import update_stages
+from commands import COMMANDS, describe
+import bulk_writer
+import metadata_profiles
+import instrumentation
+
+def positive_int(value):
+    """ argparse type for counts: an integer of at least 1. """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def row_limit(value):
+    """ argparse type for --limit: a count of rows, where 0 means no limit (None). """
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 (no limit) or more, got {value}")
+    return number or None
+
+
+def positive_float(value):
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
 
 # --- Prepare Bulk Updates ---
 def main():
     load_dotenv()
 
     # CLI arguments
-    parser = argparse.ArgumentParser(description="Import HubSpot data into MongoDB")
+    parser = argparse.ArgumentParser(
+        description="Import HubSpot data into MongoDB",
+        epilog=f"commands:\n{describe()}",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
 
     parser.add_argument(
         "command",
-        type=str,
-        help="Which import command to run (contact, activity, process, cohort, company)"
+        choices=list(COMMANDS),
+        metavar="command",
+        help="Which command to run (listed below)"
+    )
+    parser.add_argument(
+        "file",
+        nargs="?",
+        default=None,
+        help="Plan file to send (apply)"
     )
     parser.add_argument(
         "--dry-run",
@@ -31,35 +60,139 @@ def main():
     )
     parser.add_argument(
         "--limit",
-        type=int,
+        type=row_limit,
         default=None,
-        help="Limit the number of rows to import for testing"
+        help="Limit the number of rows to import for testing (0 means no limit)"
     )
     parser.add_argument(
         "--update",
         action="store_true",
         help="Update database without downloading attachments"
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=positive_int,
+        default=None,
+        help="Stream engagement CSVs in chunks of N rows and write each chunk (activity)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Worker processes that transform and write engagement files/chunks in parallel (activity)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="Number of concurrent attachment downloads (attachment)"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=positive_float,
+        default=None,
+        help="Maximum HubSpot API requests per second across all workers (attachment)"
+    )
+    parser.add_argument(
+        "--file-cache-ttl",
+        type=float,
+        default=168,
+        help="Hours HubSpot file metadata stays cached; --update runs use the cache instead of the API (attachment, default 168)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its checkpoint if the input CSVs are unchanged (activity, attachment)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=None,
+        help="Operations per bulk_write batch (default 1000)"
+    )
+    parser.add_argument(
+        "--range-size",
+        type=positive_int,
+        default=None,
+        help="Update processes in _id ranges of N with progress instead of one update_many (update)"
+    )
+    parser.add_argument(
+        "--writers",
+        type=positive_int,
+        default=None,
+        help="Number of concurrent bulk writers (default 4)"
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only write rows whose document changed since the last successful import"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=bulk_writer.MODES,
+        default=None,
+        help="Write new records as upserts (default), plain inserts (empty collections), or auto: inserts for new keys, updates for existing ones"
+    )
+    parser.add_argument(
+        "--refresh-ids",
+        action="store_true",
+        help="Discard the saved externalId snapshots and rescan the collections"
+    )
+    parser.add_argument(
+        "--metadata",
+        choices=metadata_profiles.PROFILES,
+        default="full",
+        help="Raw HubSpot columns kept in activity/cohort metadata: all, non-empty only, or the used ones (default full)"
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        default=None,
+        help="Also append each importer's per-stage timings (JSON lines) to this file"
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Run the command under cProfile and write the stats to this file (one file per stage for 'all')"
+    )
+    parser.add_argument(
+        "--plan-out",
+        type=str,
+        default=None,
+        help="Save the write operations to this plan file instead of sending them (implies --dry-run); send it later with `apply FILE`"
+    )
 
     args = parser.parse_args()
 
-    match args.command:
-        case "contact":
-            import_contact(args.limit, args.dry_run)
-        case "activity":
-            import_activity(args.limit, args.dry_run)
-        case "process":
-            import_process(args.limit, args.dry_run)
-        case "cohort":
-            import_cohort(args.limit, args.dry_run)
-        case "company":
-            import_company(args.limit, args.dry_run)
-        case "attachment":
-            download_all_engagement_attachments(args.limit, args.dry_run, args.update)
-        case "contact-cohort":
-            import_contact_cohort_links(args.limit, args.dry_run)
-        case "update":
-            update_stages()
+    if args.plan_out:
+        if args.command == "apply":
+            parser.error("--plan-out can't be used with apply")
+        if args.command == "all":
+            # Each stage would resolve ids against a database the earlier stages' plans never reached
+            parser.error("--plan-out can't be used with all; plan and apply one stage at a time")
+        from plan import start_plan
+        args.dry_run = True
+        start_plan(args.plan_out, args.command, vars(args))
+
+    if args.refresh_ids:
+        from id_resolver import clear_id_snapshots
+        clear_id_snapshots()
+
+    bulk_writer.configure(batch_size=args.batch_size, workers=args.writers, delta=args.delta, mode=args.mode,
+                          plan_path=args.plan_out and os.path.abspath(args.plan_out))
+    metadata_profiles.configure(args.metadata)
+    instrumentation.configure(args.metrics)
+
+    command = COMMANDS[args.command]
+    if args.profile and args.command != "all":
+        # 'all' profiles each stage in its own worker process instead
+        result = instrumentation.profile_call(args.profile, command.run, vars(args))
+    else:
+        result = command.run(vars(args))
+
+    if result is False:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
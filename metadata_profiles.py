@@ -0,0 +1,40 @@
+# How much of the raw HubSpot row documents keep as metadata:
+#   full   – every exported column (default)
+#   sparse – every column with a value; empty strings and missing values are dropped
+#   slim   – only the importer's whitelist; other columns are not even parsed
+PROFILES = ("full", "sparse", "slim")
+
+# main.py overrides this from the CLI via configure()
+SETTINGS = {"profile": "full"}
+
+
+def configure(profile=None):
+    if profile is None:
+        return
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown metadata profile '{profile}', expected one of {', '.join(PROFILES)}")
+    SETTINGS["profile"] = profile
+
+
+def usecols(columns):
+    """ The columns to parse from a CSV under the current profile (None = all of them). """
+    return list(columns) if SETTINGS["profile"] == "slim" else None
+
+
+def row_metadata(row, columns):
+    """ The raw row (a dict or Series) as stored in metadata under the current profile. """
+    profile = SETTINGS["profile"]
+    if profile == "slim":
+        return {key: row[key] for key in columns if key in row}
+    if profile == "sparse":
+        return {key: value for key, value in row.items() if not is_empty(value)}
+    return dict(row)
+
+
+def is_empty(value):
+    if isinstance(value, str):
+        return value == ""
+    if isinstance(value, (list, tuple, dict)):
+        return False
+    # NaN (and NaT) are the only values not equal to themselves
+    return value is None or value != value
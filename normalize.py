@@ -1,12 +1,16 @@
 import pandas as pd
 import re
+from pandas.tseries.api import guess_datetime_format
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+TRUE_VALUES = ["true", "yes", "1", "y"]
 
 def normalize_email(email):
     if pd.isna(email):
         return None
     email = email.strip().lower()
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return email if re.match(pattern, email) else None
+    return email if EMAIL_RE.match(email) else None
 
 def normalize_phone(phone):
     if pd.isna(phone) or not str(phone).strip():
@@ -28,7 +32,7 @@ def normalize_bool(value):
     if isinstance(value, (int, float)):
         return bool(value)
     if isinstance(value, str):
-        return value.strip().lower() in ["true", "yes", "1", "y"]
+        return value.strip().lower() in TRUE_VALUES
     return False
 
 def normalize_source(text):
@@ -37,4 +41,81 @@ def normalize_source(text):
 
     # Replace hyphens with spaces, split into words, capitalize each
     words = text.replace("-", " ").split()
-    return " ".join(word.capitalize() for word in words)
\ No newline at end of file
+    return " ".join(word.capitalize() for word in words)
+
+
+# --- Batch versions ---
+# Each takes a Series (or array/list) and returns a Series aligned to it
+# with exactly the values the scalar function would return per cell.
+
+def normalize_emails(values):
+    values = _as_series(values)
+    emails = _as_text(values).str.strip().str.lower()
+    valid = emails.str.match(EMAIL_PATTERN) == True
+    return _as_objects(emails.where(valid))
+
+def normalize_phones(values):
+    values = _as_series(values)
+    digits = _as_text(values).str.replace(r'\D', '', regex=True)
+    phones = ("+" + digits).where(digits.str.len() > 0)
+    return _as_objects(phones)
+
+def parse_dates(values):
+    """
+    Parse a whole column of dates. The format is detected once per column and
+    every distinct string is parsed only once; falls back to parse_date per
+    distinct value when the column does not share one unambiguous format.
+    """
+    values = _as_series(values)
+    text = _as_text(values)
+    present = text.notna() & (text.str.strip() != "")
+
+    parsed = _parse_unique_dates(pd.unique(values[present]))
+    return pd.Series(
+        [parsed[v] if p else None for v, p in zip(values, present)],
+        index=values.index,
+        dtype=object,
+    )
+
+def normalize_bools(values):
+    values = _as_series(values)
+    if pd.api.types.infer_dtype(values, skipna=False) != "string":
+        return values.map(normalize_bool).astype(bool)
+    return values.astype(object).str.strip().str.lower().isin(TRUE_VALUES)
+
+def _parse_unique_dates(uniques):
+    """ Map each distinct date string to its parsed datetime. """
+    if len(uniques) == 0:
+        return {}
+
+    fmt = guess_datetime_format(str(uniques[0]))
+    # Only trust a detected format when it reads month before day, the same way
+    # the scalar parser does; day-first guesses would disagree on ambiguous dates.
+    if fmt and ("%d" not in fmt or fmt.find("%m") < fmt.find("%d")):
+        try:
+            parsed = pd.to_datetime(pd.Index(uniques, dtype=object), format=fmt).to_pydatetime()
+            return dict(zip(uniques, parsed))
+        except (ValueError, TypeError, OverflowError):
+            pass
+
+    return {value: parse_date(value) for value in uniques}
+
+def _as_series(values):
+    if isinstance(values, pd.Series):
+        return values
+    return pd.Series(values, dtype=object)
+
+def _as_text(values):
+    """
+    Values as Python strings (like str(value)), keeping missing values missing.
+    Always object dtype: Arrow-backed string kernels don't strip, lowercase or
+    match \\D exactly like Python str does.
+    """
+    if pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+        return values.astype(object)
+    return values.astype(object).map(str, na_action="ignore").astype(object)
+
+def _as_objects(series):
+    """ Object Series with None in place of missing values. """
+    series = series.astype(object)
+    return series.where(series.notna(), None)
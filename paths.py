@@ -41,3 +41,14 @@ ENGAGEMENT_JOIN_PATHS = {
     "deal": ENGAGEMENT_DEAL_JOIN,
     "company": ENGAGEMENT_COMPANY_JOIN
 }
+
+# Local caches
+CACHE_DIR = "./.cache"
+ID_SNAPSHOT_DIR = f"{CACHE_DIR}/ids"
+FINGERPRINT_DIR = f"{CACHE_DIR}/fingerprints"
+CSV_CACHE_DIR = f"{CACHE_DIR}/csv"
+CHECKPOINT_DIR = f"{CACHE_DIR}/checkpoints"
+FILE_METADATA_CACHE = f"{CACHE_DIR}/hubspot_files.sqlite"
+
+# Operations a bulk write could not apply (see bulk_writer.py)
+FAILURE_DIR = "./failures"
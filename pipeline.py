@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import bulk_writer
+import metadata_profiles
+import instrumentation
+from commands import COMMANDS
+
+# Stage → stages that must have finished before it can start
+STAGE_DEPENDENCIES = {
+    "contact": [],
+    "cohort": [],
+    "company": ["contact"],
+    "process": ["contact", "cohort"],
+    "contact-cohort": ["contact", "cohort"],
+    "activity": ["contact", "company", "process"],
+    "attachment": ["activity"],
+}
+
+
+def run_all(options):
+    """
+    Run every import stage in dependency order. Stages whose prerequisites are done
+    run at the same time, each in its own worker process. When a stage fails no new
+    stages are started. Prints a per-stage timing summary and returns True when every
+    stage succeeded.
+    """
+    writer_settings = dict(bulk_writer.SETTINGS)
+    done, failed, running = set(), set(), {}
+    timings = {}
+    wall_start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=len(STAGE_DEPENDENCIES)) as executor:
+        while True:
+            if not failed:
+                for stage in ready_stages(done, running):
+                    print(f"▶️ Starting {stage}")
+                    future = executor.submit(run_stage, stage, options, writer_settings)
+                    running[future] = (stage, time.perf_counter())
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, start = running.pop(future)
+                timings[stage] = time.perf_counter() - start
+                error = future.exception()
+                if error:
+                    failed.add(stage)
+                    print(f"❌ {stage} failed after {timings[stage]:.1f}s: {error!r}")
+                else:
+                    done.add(stage)
+                    print(f"✅ {stage} finished in {timings[stage]:.1f}s")
+
+    print_summary(timings, done, failed, time.perf_counter() - wall_start)
+    return not failed and len(done) == len(STAGE_DEPENDENCIES)
+
+
+def ready_stages(done, running):
+    started = done | {stage for stage, _ in running.values()}
+    return [
+        stage for stage, needs in STAGE_DEPENDENCIES.items()
+        if stage not in started and all(need in done for need in needs)
+    ]
+
+
+def run_stage(stage, options, writer_settings):
+    """ Runs in a worker process. """
+    bulk_writer.configure(**writer_settings)
+    metadata_profiles.configure(options["metadata"])
+    instrumentation.configure(options["metrics"])
+
+    # Stages are the importer commands of the same name
+    command = COMMANDS[stage]
+    if options["profile"]:
+        instrumentation.profile_call(f"{options['profile']}.{stage}", command.run, options)
+    else:
+        command.run(options)
+
+
+def print_summary(timings, done, failed, wall_time):
+    print("\n⏱️ Stage timings")
+    for stage in STAGE_DEPENDENCIES:
+        if stage in done:
+            status = "ok"
+        elif stage in failed:
+            status = "failed"
+        else:
+            status = "not run"
+        seconds = f"{timings[stage]:.1f}s" if stage in timings else "-"
+        print(f"   {stage:<15} {status:<8} {seconds:>9}")
+    print(f"   {'total (sum)':<15} {'':<8} {sum(timings.values()):>8.1f}s")
+    print(f"   {'wall clock':<15} {'':<8} {wall_time:>8.1f}s")
@@ -0,0 +1,161 @@
+import os
+import time
+from contextlib import ExitStack
+import bson
+import paths
+
+# A plan is the write operations an import would send, saved instead of sent
+# (`--plan-out FILE`, which implies --dry-run) so they can be reviewed, diffed and
+# applied later with `python main.py apply FILE`.
+#
+# The file is a stream of BSON documents: a header describing the run and the
+# source CSVs, then one record per operation:
+#     {"collection": "activities", "op": "update", "filter": {...},
+#      "update": {...}, "upsert": true, "fingerprint": <bytes, with --delta>}
+#     {"collection": "...", "op": "insert", "document": {...}}
+# Records are the operations as the importer built them, before --mode turns
+# upserts into inserts; apply decides that against the collection it writes to.
+
+PLAN_VERSION = 1
+
+
+def start_plan(path, command, options):
+    """ Create (or truncate) the plan file and write its header. """
+    header = {
+        "plan": PLAN_VERSION,
+        "command": command,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "database": os.getenv("DB_NAME"),
+        "options": {key: value for key, value in options.items() if isinstance(value, (str, int, float, bool))},
+        "sources": source_files(),
+    }
+    write_header(path, header)
+    print(f"📝 Writing the planned operations to {path} (nothing is sent to MongoDB)")
+
+
+def write_header(path, header, exclusive=False):
+    """
+    Create (or truncate) a plan file with just its header. With exclusive, an
+    existing file is never overwritten: FileExistsError is raised instead.
+    """
+    with open(path, "xb" if exclusive else "wb") as f:
+        f.write(bson.encode(header))
+
+
+def source_files():
+    """ Size and modification time of every export CSV that exists. """
+    csvs = [value for name, value in vars(paths).items() if name.isupper() and isinstance(value, str)]
+    csvs += paths.ENGAGEMENT_PATHS + paths.PROCESS_JOIN_PATHS + list(paths.ENGAGEMENT_JOIN_PATHS.values())
+    sources = []
+    for path in sorted(set(csvs)):
+        if path.endswith(".csv") and os.path.exists(path):
+            stat = os.stat(path)
+            sources.append({"path": path, "size": stat.st_size, "mtime": int(stat.st_mtime)})
+    return sources
+
+
+class PlanRecorder:
+    """
+    Appends a writer's batches to a plan file. Each batch is a single append, so
+    writers in several threads or worker processes can share one file.
+    """
+
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def write(self, collection_name, writes, hashes):
+        self.write_records(
+            encode_write(collection_name, write, digest)
+            for write, (_, digest) in zip(writes, hashes)
+        )
+
+    def write_records(self, records):
+        os.write(self.fd, b"".join(bson.encode(record) for record in records))
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def encode_write(collection_name, write, digest=None):
+    """ The plan record of a bulk_writer.Write. """
+    record = {"collection": collection_name}
+    if write.filter is None:
+        record.update(op="insert", document=write.document)
+    else:
+        record.update(op="update", filter=write.filter, update=write.update, upsert=bool(write.upsert))
+    if digest is not None:
+        record["fingerprint"] = digest
+    return record
+
+
+def add_record(writer, record):
+    """ Queue a plan record on a BulkWriter. """
+    op = record["op"]
+    if op == "update":
+        writer.add(record["filter"], record["update"], upsert=record.get("upsert", False),
+                   digest=record.get("fingerprint"))
+    elif op == "insert":
+        writer.insert(record["document"])
+    else:
+        raise ValueError(f"Unknown plan operation '{op}'")
+
+
+def read_plan(f):
+    """ The header of an open plan file and an iterator over its operation records. """
+    records = bson.decode_file_iter(f)
+    header = next(records, None)
+    if not header or "plan" not in header:
+        raise ValueError(f"{f.name} is not a plan file")
+    return header, records
+
+
+def apply_plan(path, dry_run=False):
+    """ The `apply` command: stream a plan's operations into MongoDB in batches. """
+    from pymongo import MongoClient
+    from bulk_writer import BulkWriter
+
+    if not path:
+        print("❌ apply needs the plan file: python main.py apply FILE")
+        return False
+
+    client = MongoClient(os.getenv("MONGODB"))
+    db = client[os.getenv("DB_NAME")]
+    writers = {}
+
+    with open(path, "rb") as f, ExitStack() as stack:
+        header, records = read_plan(f)
+        describe_plan(header, db.name)
+
+        for record in records:
+            name = record["collection"]
+            if name not in writers:
+                writers[name] = stack.enter_context(BulkWriter(db[name], dry_run=dry_run))
+            add_record(writers[name], record)
+
+    client.close()
+
+    if not writers:
+        print("⚠️ The plan has no operations.")
+    for name, writer in writers.items():
+        if dry_run:
+            print(f"🧪 Dry run — {name}: {writer.totals.operations} operations in {writer.totals.batches} batches")
+        else:
+            print(f"✅ {name}: {writer.totals}")
+    return True
+
+
+def describe_plan(header, db_name):
+    print(f"📄 Plan from `{header['command']}`, created {header['created']}")
+    for source in header.get("sources", []):
+        note = ""
+        if not os.path.exists(source["path"]):
+            note = " (missing now)"
+        else:
+            stat = os.stat(source["path"])
+            if stat.st_size != source["size"] or int(stat.st_mtime) != source["mtime"]:
+                note = " (changed since)"
+        print(f"   {source['path']}: {source['size']} bytes{note}")
+    if header.get("database") and header["database"] != db_name:
+        print(f"⚠️ The plan was made against database {header['database']}, applying it to {db_name}")
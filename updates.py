@@ -1,27 +1,72 @@
-from pymongo import MongoClient, UpdateOne
+from pymongo import MongoClient
+from instrumentation import RunMetrics
 import os
 
-def update_stages():
+# Processes that have stages and a currentStage field
+STAGES_FILTER = {"stages.0": {"$exists": True}, "currentStage": {"$exists": True}}
+
+# currentStage = stages[0]._id, computed by the server (pipeline updates need MongoDB 4.2+)
+FIRST_STAGE_ID = {"$let": {"vars": {"first": {"$arrayElemAt": ["$stages", 0]}}, "in": "$$first._id"}}
+SET_CURRENT_STAGE = [{"$set": {"currentStage": FIRST_STAGE_ID}}]
+
+
+def update_stages(dry_run=False, range_size=None):
+    """
+    Point every process's currentStage at its first stage, without sending the
+    documents to the client: one server-side update_many, or with range_size, one
+    update_many per _id range of that many documents (with progress).
+    """
+    metrics = RunMetrics("update")
     client = MongoClient(os.getenv("MONGODB"))
     db = client[os.getenv("DB_NAME")]
     processes = db["processes"]
 
-    operations = []
+    if dry_run:
+        total = processes.count_documents(STAGES_FILTER)
+        stale = processes.count_documents({**STAGES_FILTER, "$expr": {"$ne": ["$currentStage", FIRST_STAGE_ID]}})
+        metrics.lap("count", total)
+        metrics.finish()
+        print(f"🧪 Dry run: {stale} of {total} processes would get a new currentStage.")
+        return
 
-    for proc in processes.find({"stages.0": {"$exists": True}, "currentStage": {"$exists": True}}):
-        stages = proc.get("stages")
-        current_stage_val = proc.get("currentStage")
-
-        if stages:
-            operations.append(
-                UpdateOne(
-                    {"_id": proc["_id"]},
-                    {"$set": {"currentStage": stages[0]["_id"]}}
-                )
-            )
+    if range_size:
+        matched, modified = update_in_ranges(processes, range_size)
+    else:
+        result = processes.update_many(STAGES_FILTER, SET_CURRENT_STAGE)
+        matched, modified = result.matched_count, result.modified_count
+    metrics.lap("update", matched)
+    metrics.finish()
 
-    if operations:
-        result = processes.bulk_write(operations)
-        print(f"✅ Bulk update complete. Matched: {result.matched_count}, Modified: {result.modified_count}")
+    if matched:
+        print(f"✅ Stage update complete. Matched: {matched}, Modified: {modified}")
     else:
-        print("⚠️ No processes needed updating.")
\ No newline at end of file
+        print("⚠️ No processes needed updating.")
+
+
+def update_in_ranges(processes, range_size):
+    """
+    Run the update over consecutive _id ranges of range_size matching documents.
+    Only the _id closing each range is read. Returns (matched, modified).
+    """
+    total = processes.count_documents(STAGES_FILTER)
+    matched = modified = 0
+    lower = None
+
+    while True:
+        range_filter = dict(STAGES_FILTER)
+        if lower is not None:
+            range_filter["_id"] = {"$gt": lower}
+
+        # Last _id of this range, or None when fewer than range_size are left
+        boundary = next(processes.find(range_filter, {"_id": 1}).sort("_id", 1).skip(range_size - 1).limit(1), None)
+        if boundary is not None:
+            range_filter["_id"] = {**range_filter.get("_id", {}), "$lte": boundary["_id"]}
+
+        result = processes.update_many(range_filter, SET_CURRENT_STAGE)
+        matched += result.matched_count
+        modified += result.modified_count
+        print(f"   → {matched}/{total} processes updated")
+
+        if boundary is None:
+            return matched, modified
+        lower = boundary["_id"]